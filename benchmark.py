@@ -0,0 +1,376 @@
+"""
+Replay-based load benchmark for the webhook server.
+
+Runs webhook/server.py in-process against local stand-ins for OpenAI chat
+completions and Kokoro TTS (configurable latency and failure rates), replays
+recorded payloads or synthetic multi-session Omi streams at a target rate, and
+reports latency percentiles, throughput and memory growth.
+
+Examples:
+    python benchmark.py --sessions 20 --segments 30 --rate 50
+    python benchmark.py --payloads recorded.jsonl --rate 20 --llm-latency 400
+    python benchmark.py --env TTS_BACKGROUND=true --output bench/background.json
+
+Results are written as JSON (default: bench_results.json) so runs can be
+compared across commits.
+"""
+
+import argparse
+import asyncio
+import json
+import os
+import random
+import shutil
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+from datetime import datetime
+
+import httpx
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, Response, StreamingResponse
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+PORTUGUESE_LINES = [
+    "Ah, foi muito difícil quando ela partiu, sabe?",
+    "A gente se vira, né? Faz parte.",
+    "Tenho muita saudade daquela época.",
+    "Ela era tudo pra mim, minha melhor amiga.",
+    "Meu pai trabalhava na roça desde criança.",
+    "Quando eu era pequeno a gente morava no interior.",
+    "Às vezes eu penso em voltar pro Brasil.",
+    "Minha avó fazia o melhor pão de queijo do mundo.",
+]
+ENGLISH_LINES = [
+    "Yeah, I've been working at that company for a while.",
+    "Okay, sure.",
+    "That sounds great, thanks.",
+    "I think we should get going soon.",
+]
+SUGGESTIONS = [
+    '🔄 "It was really hard when she left, you know?"\n💬 Say: "O que você mais sente falta dela?"\n   (What do you miss most about her?)',
+    '🔄 "We manage, right? It\'s part of life."\n💬 Say: "O que te dá força pra continuar?"\n   (What gives you strength to keep going?)',
+    '🔄 "I miss those times a lot."\n💬 Say: "Qual é a sua lembrança favorita dessa época?"\n   (What is your favorite memory from that time?)',
+    '🔄 "She was everything to me."\n💬 Say: "Como ela era?"\n   (What was she like?)',
+]
+SKIP_REPLY = "✓ [No action needed]"
+ENGLISH_HINTS = (" the ", " i ", "i've", " and ", "okay", "thanks", "yeah", " we ")
+
+
+# ============== Stand-in dependencies ==============
+
+class Behaviour:
+    """Latency/failure profile for a fake dependency."""
+
+    def __init__(self, latency_ms: float, jitter_ms: float, failure_rate: float):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.failure_rate = failure_rate
+        self.calls = 0
+        self.failures = 0
+
+    async def delay(self) -> bool:
+        """Sleep for one simulated call; returns False if this call should fail."""
+        self.calls += 1
+        await asyncio.sleep(max(0.0, random.gauss(self.latency_ms, self.jitter_ms)) / 1000)
+        if random.random() < self.failure_rate:
+            self.failures += 1
+            return False
+        return True
+
+
+def coaching_reply(latest: str) -> str:
+    lowered = f" {latest.lower()} "
+    if any(hint in lowered for hint in ENGLISH_HINTS):
+        return SKIP_REPLY
+    return SUGGESTIONS[sum(map(ord, latest)) % len(SUGGESTIONS)]
+
+
+def fake_openai_app(behaviour: Behaviour) -> FastAPI:
+    app = FastAPI()
+
+    @app.post("/v1/chat/completions")
+    async def completions(request: Request):
+        body = await request.json()
+        if not await behaviour.delay():
+            return JSONResponse({"error": {"message": "simulated failure", "type": "server_error"}}, status_code=500)
+
+        system = body["messages"][0]["content"]
+        user = body["messages"][-1]["content"]
+        if system.startswith("Translate each numbered"):
+            content = "\n".join(f"{line.split('. ', 1)[0]}. [pt] {line.split('. ', 1)[-1]}" for line in user.splitlines())
+        elif system.startswith("Translate"):
+            content = f"[pt] {user}"
+        else:
+            content = coaching_reply(user.rsplit("Latest:", 1)[-1])
+
+        usage = {"prompt_tokens": len(system + user) // 4, "completion_tokens": len(content) // 4}
+        usage["total_tokens"] = usage["prompt_tokens"] + usage["completion_tokens"]
+        base = {"id": "chatcmpl-bench", "created": int(time.time()), "model": body.get("model", "bench")}
+
+        if not body.get("stream"):
+            return {**base, "object": "chat.completion", "usage": usage, "choices": [
+                {"index": 0, "message": {"role": "assistant", "content": content}, "finish_reason": "stop"}]}
+
+        async def stream():
+            for i in range(0, len(content), 8):
+                await asyncio.sleep(0.002)
+                chunk = {**base, "object": "chat.completion.chunk", "choices": [
+                    {"index": 0, "delta": {"content": content[i:i + 8]}, "finish_reason": None}]}
+                yield f"data: {json.dumps(chunk)}\n\n"
+            if (body.get("stream_options") or {}).get("include_usage"):
+                yield f"data: {json.dumps({**base, 'object': 'chat.completion.chunk', 'choices': [], 'usage': usage})}\n\n"
+            yield "data: [DONE]\n\n"
+
+        return StreamingResponse(stream(), media_type="text/event-stream")
+
+    return app
+
+
+def fake_kokoro_app(behaviour: Behaviour, bytes_per_char: int) -> FastAPI:
+    app = FastAPI()
+
+    @app.post("/v1/audio/speech")
+    async def speech(request: Request):
+        body = await request.json()
+        if not await behaviour.delay():
+            return JSONResponse({"detail": "simulated failure"}, status_code=500)
+        audio = b"ID3" + os.urandom(max(1, len(body["input"]) * bytes_per_char))
+        fmt = body.get("response_format", "mp3")
+        return Response(content=audio, media_type="audio/ogg" if fmt == "opus" else "audio/mpeg")
+
+    return app
+
+
+def free_port() -> int:
+    with socket.socket() as s:
+        s.bind(("127.0.0.1", 0))
+        return s.getsockname()[1]
+
+
+def serve_in_thread(app: FastAPI) -> tuple[uvicorn.Server, int]:
+    port = free_port()
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    threading.Thread(target=server.run, daemon=True).start()
+    while not server.started:
+        time.sleep(0.01)
+    return server, port
+
+
+# ============== Workload ==============
+
+def load_payloads(path: str) -> list[dict]:
+    """Read recorded webhook payloads (one JSON object per line)."""
+    payloads = []
+    with open(path, encoding="utf-8") as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            record = json.loads(line)
+            if "payload" in record:
+                payloads.append(record["payload"])
+            elif any(k in record for k in ("segments", "transcript", "text")):
+                payloads.append(record)
+            elif isinstance(record.get("body"), str):
+                payloads.append({"transcript": record["body"]})
+    return payloads
+
+
+def synthetic_payloads(sessions: int, segments: int, english_ratio: float, seed: int) -> list[dict]:
+    """Interleaved Omi-style streams: each call resends the session's growing segment list."""
+    rng = random.Random(seed)
+    streams = []
+    for s in range(sessions):
+        history, payloads = [], []
+        for n in range(segments):
+            english = rng.random() < english_ratio
+            text = rng.choice(ENGLISH_LINES if english else PORTUGUESE_LINES)
+            history.append({"id": f"{s}-{n}", "text": text, "speaker": "SPEAKER_01",
+                            "is_user": False, "start": n * 3.0, "end": n * 3.0 + 2.5})
+            payloads.append({"session_id": f"bench-{s}", "segments": list(history)})
+        streams.append(payloads)
+
+    interleaved = []
+    for n in range(segments):
+        for stream in streams:
+            interleaved.append(stream[n])
+    return interleaved
+
+
+def current_rss_bytes() -> int | None:
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+    except (OSError, ValueError):
+        return None
+
+
+def percentile(values: list[float], pct: float) -> float:
+    if not values:
+        return 0.0
+    ordered = sorted(values)
+    index = min(len(ordered) - 1, max(0, round(pct / 100 * len(ordered) + 0.5) - 1))
+    return ordered[index]
+
+
+async def run_load(app, payloads: list[dict], rate: float, timeout: float) -> dict:
+    latencies: list[float] = []
+    statuses: dict[str, int] = {}
+    messages = 0
+    rss_samples = []
+
+    transport = httpx.ASGITransport(app=app)
+    async with app.router.lifespan_context(app):
+        async with httpx.AsyncClient(transport=transport, base_url="http://bench", timeout=timeout) as http:
+            rss_start = current_rss_bytes()
+
+            async def send(payload: dict):
+                nonlocal messages
+                started = time.perf_counter()
+                try:
+                    response = await http.post("/webhook", json=payload)
+                    key = str(response.status_code)
+                    if response.status_code == 200 and response.json().get("message"):
+                        messages += 1
+                except Exception as e:
+                    key = type(e).__name__
+                latencies.append((time.perf_counter() - started) * 1000)
+                statuses[key] = statuses.get(key, 0) + 1
+
+            tasks = []
+            began = time.perf_counter()
+            for i, payload in enumerate(payloads):
+                # Open-loop arrivals: send on schedule whether or not earlier calls finished
+                delay = began + i / rate - time.perf_counter()
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                tasks.append(asyncio.create_task(send(payload)))
+                if i % 50 == 0:
+                    rss_samples.append(current_rss_bytes())
+            await asyncio.gather(*tasks)
+            elapsed = time.perf_counter() - began
+            rss_end = current_rss_bytes()
+
+            health = (await http.get("/")).json()
+
+    return {
+        "requests": len(payloads),
+        "elapsed_seconds": round(elapsed, 3),
+        "requests_per_second": round(len(payloads) / elapsed, 2) if elapsed else 0.0,
+        "messages_returned": messages,
+        "statuses": statuses,
+        "latency_ms": {
+            "p50": round(percentile(latencies, 50), 2),
+            "p95": round(percentile(latencies, 95), 2),
+            "p99": round(percentile(latencies, 99), 2),
+            "max": round(max(latencies, default=0.0), 2),
+            "mean": round(statistics.fmean(latencies), 2) if latencies else 0.0,
+        },
+        "memory": {
+            "rss_start_bytes": rss_start,
+            "rss_end_bytes": rss_end,
+            "rss_growth_bytes": rss_end - rss_start if rss_start and rss_end else None,
+            "rss_peak_sampled_bytes": max((r for r in rss_samples if r), default=None),
+        },
+        "server_health": health,
+    }
+
+
+def git_commit() -> str | None:
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], cwd=ROOT, text=True).strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Load benchmark for the Bilingual Coach webhook.")
+    parser.add_argument("--payloads", help="JSONL file of recorded webhook payloads (default: synthetic)")
+    parser.add_argument("--sessions", type=int, default=10, help="synthetic: concurrent sessions")
+    parser.add_argument("--segments", type=int, default=20, help="synthetic: segments per session")
+    parser.add_argument("--english-ratio", type=float, default=0.4, help="synthetic: share of English/filler lines")
+    parser.add_argument("--repeat", type=int, default=1, help="replay the payload list this many times")
+    parser.add_argument("--rate", type=float, default=20.0, help="target requests per second")
+    parser.add_argument("--timeout", type=float, default=60.0, help="client timeout per request (s)")
+    parser.add_argument("--llm-latency", type=float, default=300.0, help="fake OpenAI latency (ms)")
+    parser.add_argument("--llm-jitter", type=float, default=50.0)
+    parser.add_argument("--llm-failure-rate", type=float, default=0.0)
+    parser.add_argument("--tts-latency", type=float, default=500.0, help="fake Kokoro latency (ms)")
+    parser.add_argument("--tts-jitter", type=float, default=100.0)
+    parser.add_argument("--tts-failure-rate", type=float, default=0.0)
+    parser.add_argument("--tts-bytes-per-char", type=int, default=600, help="fake clip size per input char")
+    parser.add_argument("--env", action="append", default=[], metavar="KEY=VALUE",
+                        help="extra server settings, e.g. --env TTS_BACKGROUND=true")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--output", default="bench_results.json")
+    args = parser.parse_args()
+
+    random.seed(args.seed)
+    llm = Behaviour(args.llm_latency, args.llm_jitter, args.llm_failure_rate)
+    tts = Behaviour(args.tts_latency, args.tts_jitter, args.tts_failure_rate)
+    _, openai_port = serve_in_thread(fake_openai_app(llm))
+    _, kokoro_port = serve_in_thread(fake_kokoro_app(tts, args.tts_bytes_per_char))
+
+    # Point the server at the stand-ins before it is imported (it reads settings at import)
+    os.environ["OPENAI_API_KEY"] = "bench"
+    os.environ["OPENAI_BASE_URL"] = f"http://127.0.0.1:{openai_port}/v1"
+    os.environ["KOKORO_TTS_URL"] = f"http://127.0.0.1:{kokoro_port}"
+    os.environ.setdefault("LOG_LEVEL", "WARNING")
+    # Keep the stand-ins' fake audio and state out of the real data directories
+    data_dir = tempfile.mkdtemp(prefix="coach-bench-")
+    os.environ["AUDIO_DIR"] = os.path.join(data_dir, "audio")
+    os.environ["STATE_DB_PATH"] = os.path.join(data_dir, "state.db")
+    os.environ["PHRASE_LIBRARY_DIR"] = os.path.join(data_dir, "phrase_library")
+    for item in args.env:
+        key, _, value = item.partition("=")
+        os.environ[key] = value
+    sys.path.insert(0, os.path.join(ROOT, "webhook"))
+    import server
+
+    if args.payloads:
+        payloads = load_payloads(args.payloads)
+    else:
+        payloads = synthetic_payloads(args.sessions, args.segments, args.english_ratio, args.seed)
+    payloads = payloads * args.repeat
+    if not payloads:
+        sys.exit("No payloads to replay")
+
+    print(f"Replaying {len(payloads)} webhook calls at {args.rate}/s ...")
+    try:
+        results = asyncio.run(run_load(server.app, payloads, args.rate, args.timeout))
+    finally:
+        shutil.rmtree(data_dir, ignore_errors=True)
+    results = {
+        "commit": git_commit(),
+        "timestamp": datetime.now().isoformat(),
+        "config": {k: v for k, v in vars(args).items()},
+        **results,
+        "dependencies": {
+            "openai": {"calls": llm.calls, "failures": llm.failures},
+            "kokoro": {"calls": tts.calls, "failures": tts.failures},
+        },
+    }
+
+    with open(args.output, "w", encoding="utf-8") as f:
+        json.dump(results, f, indent=2, ensure_ascii=False)
+
+    lat = results["latency_ms"]
+    print(f"{results['requests']} requests in {results['elapsed_seconds']}s "
+          f"({results['requests_per_second']} req/s), {results['messages_returned']} suggestions")
+    print(f"latency ms  p50={lat['p50']}  p95={lat['p95']}  p99={lat['p99']}  max={lat['max']}")
+    growth = results["memory"]["rss_growth_bytes"]
+    if growth is not None:
+        print(f"RSS growth: {growth / 1024 / 1024:.1f} MB")
+    print(f"OpenAI calls: {llm.calls}  Kokoro calls: {tts.calls}")
+    print(f"Results saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
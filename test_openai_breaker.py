@@ -0,0 +1,81 @@
+"""
+Regression tests for OpenAI calls cut short by webhook deadlines: a stalled
+OpenAI must still trip the OpenAI circuit breaker, and a call the webhook
+abandoned must not go on to synthesize audio.
+
+Runs the server in-process against the benchmark's stand-in dependencies:
+    python -m pytest test_openai_breaker.py
+"""
+
+import os
+import sys
+import tempfile
+import time
+
+import pytest
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, ROOT)
+
+import benchmark  # noqa: E402
+
+
+@pytest.fixture(scope="module")
+def stand_ins():
+    llm = benchmark.Behaviour(0, 0, 0)
+    tts = benchmark.Behaviour(5, 0, 0)
+    _, openai_port = benchmark.serve_in_thread(benchmark.fake_openai_app(llm))
+    _, kokoro_port = benchmark.serve_in_thread(benchmark.fake_kokoro_app(tts, 100))
+    data_dir = tempfile.mkdtemp(prefix="coach-test-")
+    os.environ.update({
+        "OPENAI_API_KEY": "test",
+        "OPENAI_BASE_URL": f"http://127.0.0.1:{openai_port}/v1",
+        "KOKORO_TTS_URL": f"http://127.0.0.1:{kokoro_port}",
+        "LOG_LEVEL": "ERROR",
+        "WEBHOOK_DEADLINE_SECONDS": "0.5",
+        "WEBHOOK_MIN_LLM_SECONDS": "0.1",
+        "LLM_TIMEOUT_SECONDS": "0.8",
+        "BREAKER_MIN_CALLS": "3",
+        "COACH_CACHE_POLICY": "off",
+        "PHRASE_LIBRARY_ENABLED": "false",
+        "AUDIO_DIR": os.path.join(data_dir, "audio"),
+        "STATE_DB_PATH": os.path.join(data_dir, "state.db"),
+        "PHRASE_LIBRARY_DIR": os.path.join(data_dir, "phrase_library"),
+    })
+    sys.path.insert(0, os.path.join(ROOT, "webhook"))
+    import server
+    return server, llm, tts
+
+
+def post_within_deadline(client, line: str):
+    started = time.monotonic()
+    assert client.post("/webhook", json={"transcript": line}).json()["message"] is None
+    # The webhook gives up at its own deadline, not the LLM's
+    assert time.monotonic() - started < 0.8
+
+
+def test_abandoned_call_makes_no_audio(stand_ins):
+    server, llm, tts = stand_ins
+    from fastapi.testclient import TestClient
+
+    # Slower than the webhook deadline, within the LLM's own budget
+    llm.latency_ms = 650
+    with TestClient(server.app) as client:
+        post_within_deadline(client, benchmark.PORTUGUESE_LINES[0])
+        time.sleep(0.5)
+        assert tts.calls == 0
+        assert len(server.audio_store) == 0
+        assert server.openai_breaker.stats()["window_failure_rate"] == 0.0
+
+
+def test_stalled_openai_trips_breaker(stand_ins):
+    server, llm, _ = stand_ins
+    from fastapi.testclient import TestClient
+
+    llm.latency_ms = 1500
+    with TestClient(server.app) as client:
+        for line in benchmark.PORTUGUESE_LINES[1:4]:
+            post_within_deadline(client, line)
+        # Abandoned calls run out their own budget in the background
+        time.sleep(1.0)
+        assert server.openai_breaker.state == "open"
@@ -0,0 +1,117 @@
+"""
+Admission control and deadlines for webhook work.
+
+Only a bounded number of coaching requests run at once; the rest wait in a
+bounded queue. When the queue (or one session's share of it) is full, the
+oldest waiter is shed in favour of the newest, and waiters that can't start
+before their deadline are shed too: a suggestion that arrives after the moment
+has passed is worth less than none.
+"""
+
+import asyncio
+import time
+from collections import OrderedDict
+
+
+class Deadline:
+    """End-to-end time budget for one webhook call."""
+
+    def __init__(self, seconds: float):
+        self.seconds = seconds
+        self.expires_at = time.monotonic() + seconds
+
+    def remaining(self) -> float:
+        return max(0.0, self.expires_at - time.monotonic())
+
+    @property
+    def expired(self) -> bool:
+        return time.monotonic() >= self.expires_at
+
+
+class Shed(Exception):
+    """Work dropped to protect latency; reason says why."""
+
+    def __init__(self, reason: str):
+        super().__init__(reason)
+        self.reason = reason
+
+
+class AdmissionController:
+    """Bounded concurrency with bounded global and per-session wait queues."""
+
+    def __init__(self, max_inflight: int, max_queued: int, max_queued_per_session: int):
+        self.max_inflight = max_inflight
+        self.max_queued = max_queued
+        self.max_queued_per_session = max(1, max_queued_per_session)
+        self.inflight = 0
+        self.admitted = 0
+        self.queued = 0
+        self.shed: dict[str, int] = {}
+        # Waiting requests, oldest first; each future resolves to True (admitted) or a shed reason
+        self._waiters: OrderedDict[asyncio.Future, str] = OrderedDict()
+
+    async def acquire(self, session_id: str, deadline: Deadline):
+        """Wait for a work slot; raises Shed if the request is dropped instead."""
+        if self.inflight < self.max_inflight and not self._waiters:
+            self.inflight += 1
+            self.admitted += 1
+            return
+        if self.max_queued <= 0:
+            raise Shed("queue_full")
+        if deadline.expired:
+            raise Shed("deadline")
+
+        # Prefer the newest request: make room by shedding the oldest waiter
+        same_session = [f for f, sid in self._waiters.items() if sid == session_id]
+        if len(same_session) >= self.max_queued_per_session:
+            self._shed_waiter(same_session[0], "superseded")
+        elif len(self._waiters) >= self.max_queued:
+            self._shed_waiter(next(iter(self._waiters)), "queue_full")
+
+        future = asyncio.get_running_loop().create_future()
+        self._waiters[future] = session_id
+        self.queued += 1
+        try:
+            await asyncio.wait({future}, timeout=deadline.remaining())
+        except asyncio.CancelledError:
+            if future.done() and future.result() is True:
+                self.release()
+            raise
+        finally:
+            self._waiters.pop(future, None)
+
+        if not future.done():
+            future.cancel()
+            raise Shed("deadline")
+        if future.result() is not True:
+            raise Shed(future.result())
+        self.admitted += 1
+
+    def release(self):
+        """Free a work slot, handing it straight to the oldest waiter if there is one."""
+        while self._waiters:
+            future, _ = self._waiters.popitem(last=False)
+            if not future.done():
+                future.set_result(True)
+                return
+        self.inflight -= 1
+
+    def record_shed(self, reason: str):
+        self.shed[reason] = self.shed.get(reason, 0) + 1
+
+    def _shed_waiter(self, future: asyncio.Future, reason: str):
+        del self._waiters[future]
+        if not future.done():
+            future.set_result(reason)
+
+    def stats(self) -> dict:
+        return {
+            "inflight": self.inflight,
+            "max_inflight": self.max_inflight,
+            "waiting": len(self._waiters),
+            "max_queued": self.max_queued,
+            "max_queued_per_session": self.max_queued_per_session,
+            "admitted": self.admitted,
+            "queued": self.queued,
+            "shed": dict(self.shed),
+        }
@@ -0,0 +1,265 @@
+"""
+Expiring storage for generated audio clips served under /audio/{audio_id}.
+
+Expiry is tracked in a min-heap ordered by expiry time, so removing expired
+clips only touches the clips that actually expired (O(log n) each) instead of
+scanning the whole store. A background sweeper frees memory during idle
+periods, and hard caps on entry count and total bytes evict the clips closest
+to expiry first.
+
+DiskAudioStore keeps the same index in RAM but writes clip bytes (plus a small
+JSON sidecar of metadata) to a directory, so process memory stays flat however
+many clips are stored, and links survive a restart until they expire.
+"""
+
+import heapq
+import json
+import os
+import time
+from dataclasses import dataclass
+from datetime import datetime
+
+from http_cache import AUDIO_EXTENSIONS
+
+
+@dataclass
+class AudioEntry:
+    """A stored clip and its metadata."""
+    audio_id: str
+    phrase: str
+    created: datetime
+    expires_at: float
+    size: int
+    audio: bytes | None = None
+    path: str | None = None
+    response_format: str = "mp3"
+
+
+class AudioStore:
+    """In-memory audio clips with an expiry index and size caps."""
+
+    backend = "memory"
+
+    def __init__(self, ttl_seconds: float, max_entries: int, max_bytes: int):
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self.stored = 0
+        self.expired = 0
+        self.evicted = 0
+        self._entries: dict[str, AudioEntry] = {}
+        # (expires_at, audio_id); superseded pairs are skipped lazily when popped
+        self._expiry_heap: list[tuple[float, str]] = []
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    async def contains(self, audio_id: str) -> bool:
+        return self._live(audio_id) is not None
+
+    async def put(self, audio_id: str, audio: bytes, phrase: str, response_format: str = "mp3") -> AudioEntry | None:
+        """
+        Store (or refresh) a clip in the given audio format and enforce expiry and capacity limits.
+
+        A clip larger than max_bytes is not stored (it would evict itself) and None is returned.
+        """
+        if len(audio) > self.max_bytes:
+            return None
+        previous = self._entries.pop(audio_id, None)
+        if previous is not None:
+            self.total_bytes -= previous.size
+        entry = AudioEntry(
+            audio_id=audio_id,
+            phrase=phrase,
+            created=datetime.now(),
+            expires_at=time.time() + self.ttl_seconds,
+            size=len(audio),
+            response_format=response_format,
+        )
+        self._persist(entry, audio, previous)
+        self._index(entry)
+        self.stored += 1
+
+        self._sweep()
+        while self._entries and (len(self._entries) > self.max_entries
+                                 or self.total_bytes > self.max_bytes):
+            self._pop_soonest()
+            self.evicted += 1
+        self._compact_heap()
+        return entry
+
+    async def get(self, audio_id: str) -> AudioEntry | None:
+        """Return a live clip, or None if unknown or expired."""
+        return self._live(audio_id)
+
+    async def sweep(self) -> int:
+        """Drop every clip whose expiry time has passed. Returns the number removed."""
+        return self._sweep()
+
+    async def reserve(self, audio_id: str, phrase: str, seconds: float):
+        """Record that a clip is being synthesized (only shared stores need to tell other workers)."""
+
+    async def unreserve(self, audio_id: str):
+        """Drop a reservation whose synthesis failed."""
+
+    async def pending(self, audio_id: str) -> bool:
+        """Whether another worker is still synthesizing this clip."""
+        return False
+
+    def _live(self, audio_id: str) -> AudioEntry | None:
+        entry = self._entries.get(audio_id)
+        if entry is None or entry.expires_at <= time.time():
+            return None
+        return entry
+
+    def _sweep(self) -> int:
+        now = time.time()
+        removed = 0
+        while self._expiry_heap and self._expiry_heap[0][0] <= now:
+            expires_at, audio_id = heapq.heappop(self._expiry_heap)
+            entry = self._entries.get(audio_id)
+            if entry is not None and entry.expires_at == expires_at:
+                self._remove(audio_id)
+                removed += 1
+        self.expired += removed
+        return removed
+
+    def stats(self) -> dict:
+        """Live size and eviction counters."""
+        return {
+            "backend": self.backend,
+            "entries": len(self._entries),
+            "bytes": self.total_bytes,
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+            "stored": self.stored,
+            "expired": self.expired,
+            "evicted": self.evicted,
+        }
+
+    def _persist(self, entry: AudioEntry, audio: bytes, previous: AudioEntry | None):
+        """Attach the clip bytes to a new entry (backends override where they live)."""
+        entry.audio = audio
+
+    def _discard(self, entry: AudioEntry):
+        """Release whatever a removed entry holds outside the index."""
+
+    def _index(self, entry: AudioEntry):
+        self._entries[entry.audio_id] = entry
+        self.total_bytes += entry.size
+        heapq.heappush(self._expiry_heap, (entry.expires_at, entry.audio_id))
+
+    def _pop_soonest(self) -> bool:
+        """Remove the clip at the head of the expiry heap, skipping stale index entries."""
+        while self._expiry_heap:
+            expires_at, audio_id = heapq.heappop(self._expiry_heap)
+            entry = self._entries.get(audio_id)
+            if entry is not None and entry.expires_at == expires_at:
+                self._remove(audio_id)
+                return True
+        return False
+
+    def _remove(self, audio_id: str):
+        entry = self._entries.pop(audio_id, None)
+        if entry is not None:
+            self.total_bytes -= entry.size
+            self._discard(entry)
+
+    def _compact_heap(self):
+        """Rebuild the heap when refreshed clips leave too many stale pairs behind."""
+        if len(self._expiry_heap) > 2 * len(self._entries) + 64:
+            self._expiry_heap = [(e.expires_at, k) for k, e in self._entries.items()]
+            heapq.heapify(self._expiry_heap)
+
+
+class DiskAudioStore(AudioStore):
+    """
+    Audio clips spilled to a local directory, served straight from disk.
+
+    Each clip is stored as <id>.<ext> (.mp3, or .ogg for Opus) with an
+    <id>.json sidecar that records its format. Only the index
+    (ID -> path, size and metadata) lives in memory, and it is rebuilt from
+    the sidecars at startup so unexpired links keep working across restarts.
+    """
+
+    backend = "disk"
+
+    def __init__(self, directory: str, ttl_seconds: float, max_entries: int, max_bytes: int):
+        super().__init__(ttl_seconds, max_entries, max_bytes)
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self._load()
+
+    def _paths(self, audio_id: str, response_format: str) -> tuple[str, str]:
+        base = os.path.join(self.directory, audio_id)
+        return f"{base}.{AUDIO_EXTENSIONS.get(response_format, response_format)}", base + ".json"
+
+    def _persist(self, entry: AudioEntry, audio: bytes, previous: AudioEntry | None):
+        audio_path, meta_path = self._paths(entry.audio_id, entry.response_format)
+        # A refreshed content-addressed clip already has identical bytes on disk
+        if previous is None or previous.size != entry.size or not os.path.exists(audio_path):
+            _write_atomic(audio_path, audio)
+        if previous is not None and previous.path and previous.path != audio_path:
+            _remove(previous.path)
+        _write_atomic(meta_path, json.dumps({
+            "phrase": entry.phrase,
+            "format": entry.response_format,
+            "created": entry.created.isoformat(),
+            "expires_at": entry.expires_at,
+            "size": entry.size,
+        }).encode("utf-8"))
+        entry.path = audio_path
+
+    def _discard(self, entry: AudioEntry):
+        self._unlink(entry.audio_id, entry.response_format)
+
+    def _unlink(self, audio_id: str, response_format: str):
+        for path in self._paths(audio_id, response_format):
+            _remove(path)
+
+    def _load(self):
+        """Rebuild the index from sidecar files, dropping expired or orphaned clips."""
+        now = time.time()
+        for name in os.listdir(self.directory):
+            if not name.endswith(".json"):
+                continue
+            audio_id = name[:-len(".json")]
+            meta_path = os.path.join(self.directory, name)
+            response_format = "mp3"
+            try:
+                with open(meta_path, encoding="utf-8") as f:
+                    meta = json.load(f)
+                # Sidecars written before formats were recorded are MP3
+                response_format = meta.get("format", "mp3")
+                audio_path, _ = self._paths(audio_id, response_format)
+                entry = AudioEntry(
+                    audio_id=audio_id,
+                    phrase=meta["phrase"],
+                    created=datetime.fromisoformat(meta["created"]),
+                    expires_at=float(meta["expires_at"]),
+                    size=int(meta["size"]),
+                    path=audio_path,
+                    response_format=response_format,
+                )
+            except (OSError, ValueError, KeyError, AttributeError):
+                entry = None
+            if entry is None or entry.expires_at <= now or not os.path.exists(entry.path):
+                self._unlink(audio_id, response_format)
+                continue
+            self._index(entry)
+
+
+def _remove(path: str):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
+
+
+def _write_atomic(path: str, data: bytes):
+    """Write a file so readers never observe a partially written clip."""
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "wb") as f:
+        f.write(data)
+    os.replace(tmp_path, path)
@@ -0,0 +1,112 @@
+"""
+Circuit breakers for outbound dependencies (Kokoro TTS, OpenAI).
+
+A breaker watches the outcomes of recent calls. Once enough calls in the
+window have failed, it opens and callers fail fast instead of waiting on a
+dead dependency. After a cool-down it lets a single probe call through
+(half-open): success closes it again, failure re-opens it.
+"""
+
+import time
+from collections import deque
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling a dependency whose breaker is open."""
+
+    def __init__(self, name: str):
+        super().__init__(f"{name} is unavailable (circuit open)")
+        self.name = name
+
+
+class CircuitBreaker:
+    """Failure-rate breaker over a sliding time window, with half-open probing."""
+
+    def __init__(self, name: str, window_seconds: float, min_calls: int,
+                 failure_rate: float, open_seconds: float):
+        self.name = name
+        self.window_seconds = window_seconds
+        self.min_calls = min_calls
+        self.failure_rate = failure_rate
+        self.open_seconds = open_seconds
+        self.opened = 0
+        self.rejected = 0
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._probe_started: float | None = None
+        # (monotonic time, failed) for calls inside the window
+        self._outcomes: deque[tuple[float, bool]] = deque()
+        self._failures = 0
+
+    @property
+    def state(self) -> str:
+        if self._state == OPEN and time.monotonic() - self._opened_at >= self.open_seconds:
+            self._state = HALF_OPEN
+            self._probe_started = None
+        return self._state
+
+    def available(self) -> bool:
+        """Whether a call would be let through right now (without claiming the probe)."""
+        state = self.state
+        if state == HALF_OPEN:
+            # A probe that never reported back (e.g. cancelled) frees its slot after a cool-down
+            return self._probe_started is None or time.monotonic() - self._probe_started >= self.open_seconds
+        return state == CLOSED
+
+    def allow(self) -> bool:
+        """Claim permission for one call; counts a rejection if the breaker is open."""
+        if not self.available():
+            self.rejected += 1
+            return False
+        if self._state == HALF_OPEN:
+            self._probe_started = time.monotonic()
+        return True
+
+    def record_success(self):
+        if self._state == HALF_OPEN:
+            self._close()
+        else:
+            self._record(False)
+
+    def record_failure(self):
+        if self._state == HALF_OPEN:
+            self._open()
+            return
+        self._record(True)
+        calls = len(self._outcomes)
+        if self._state == CLOSED and calls >= self.min_calls and self._failures / calls >= self.failure_rate:
+            self._open()
+
+    def _record(self, failed: bool):
+        now = time.monotonic()
+        self._outcomes.append((now, failed))
+        self._failures += failed
+        while self._outcomes and now - self._outcomes[0][0] > self.window_seconds:
+            _, old_failed = self._outcomes.popleft()
+            self._failures -= old_failed
+
+    def _open(self):
+        self._state = OPEN
+        self._opened_at = time.monotonic()
+        self._probe_started = None
+        self.opened += 1
+
+    def _close(self):
+        self._state = CLOSED
+        self._probe_started = None
+        self._outcomes.clear()
+        self._failures = 0
+
+    def stats(self) -> dict:
+        calls = len(self._outcomes)
+        return {
+            "state": self.state,
+            "window_calls": calls,
+            "window_failure_rate": round(self._failures / calls, 3) if calls else 0.0,
+            "opened": self.opened,
+            "rejected": self.rejected,
+        }
@@ -0,0 +1,99 @@
+"""
+Server-Sent Events feed for the /ui dashboard.
+
+New conversation entries and audio-ready notifications are pushed to every
+connected dashboard instead of each tab polling the whole history. Each
+subscriber has a bounded queue; a subscriber that falls behind is dropped and
+reconnects with Last-Event-ID, resuming from a small replay buffer.
+"""
+
+import asyncio
+import json
+from collections import deque
+from typing import AsyncIterator
+
+
+class Subscriber:
+    """One connected dashboard."""
+
+    def __init__(self, queue_size: int):
+        self.queue: asyncio.Queue = asyncio.Queue(maxsize=queue_size)
+        self.closed = False
+
+
+class EventBroadcaster:
+    """Fan-out of dashboard events with per-subscriber backpressure."""
+
+    def __init__(self, queue_size: int, replay_size: int):
+        self.queue_size = queue_size
+        self.published = 0
+        self.dropped = 0
+        self._next_id = 1
+        self._recent: deque[tuple[int, str]] = deque(maxlen=replay_size)
+        self._subscribers: set[Subscriber] = set()
+
+    def publish(self, event: str, data: dict) -> int:
+        """Broadcast an event to every subscriber. Returns its event ID."""
+        event_id = self._next_id
+        self._next_id += 1
+        message = f"id: {event_id}\nevent: {event}\ndata: {json.dumps(data)}\n\n"
+        self._recent.append((event_id, message))
+        self.published += 1
+
+        for sub in list(self._subscribers):
+            try:
+                sub.queue.put_nowait(message)
+            except asyncio.QueueFull:
+                self._drop(sub)
+        return event_id
+
+    def subscribe(self, last_event_id: int | None = None) -> Subscriber:
+        """Register a subscriber, queueing any missed events after last_event_id."""
+        sub = Subscriber(self.queue_size)
+        if last_event_id is not None:
+            missed = [m for event_id, m in self._recent if event_id > last_event_id]
+            for message in missed[-self.queue_size:]:
+                sub.queue.put_nowait(message)
+        self._subscribers.add(sub)
+        return sub
+
+    def unsubscribe(self, sub: Subscriber):
+        self._subscribers.discard(sub)
+
+    async def stream(self, sub: Subscriber, heartbeat_seconds: float) -> AsyncIterator[str]:
+        """Yield SSE messages for a subscriber until it is dropped or disconnects."""
+        try:
+            yield "retry: 2000\n\n"
+            while True:
+                try:
+                    message = await asyncio.wait_for(sub.queue.get(), timeout=heartbeat_seconds)
+                except asyncio.TimeoutError:
+                    yield ": keep-alive\n\n"
+                    continue
+                if message is None:
+                    return
+                yield message
+        finally:
+            self.unsubscribe(sub)
+
+    def close(self):
+        """End every open stream (used at shutdown)."""
+        for sub in list(self._subscribers):
+            self._drop(sub, slow=False)
+
+    def stats(self) -> dict:
+        return {
+            "subscribers": len(self._subscribers),
+            "published": self.published,
+            "dropped": self.dropped,
+        }
+
+    def _drop(self, sub: Subscriber, slow: bool = True):
+        """Disconnect a subscriber; it may resume later from its last event ID."""
+        self._subscribers.discard(sub)
+        sub.closed = True
+        if slow:
+            self.dropped += 1
+        while not sub.queue.empty():
+            sub.queue.get_nowait()
+        sub.queue.put_nowait(None)
@@ -0,0 +1,69 @@
+"""
+Ring-buffer conversation history with monotonically increasing sequence numbers.
+
+Appending is O(1) however large the buffer is (the oldest entry drops off the
+other end), and each entry gets a sequence number, so readers can ask for just
+the entries after the last one they saw. Because entries are never modified
+after they are appended, (epoch, last_seq) fully identifies the history's
+state and doubles as an ETag.
+"""
+
+import uuid
+from collections import deque
+from itertools import islice
+
+
+class ConversationHistory:
+    """Bounded, append-only conversation history."""
+
+    def __init__(self, max_entries: int):
+        self.max_entries = max_entries
+        self.last_seq = 0
+        self.audio_count = 0
+        # Changes on every restart so clients never match an ETag from a previous run
+        self.epoch = uuid.uuid4().hex[:8]
+        self._entries: deque[dict] = deque()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    async def append(self, record: dict) -> dict:
+        """Add a record, assigning it the next sequence number."""
+        self.last_seq += 1
+        record["seq"] = self.last_seq
+        self._entries.append(record)
+        if record.get("audio_url"):
+            self.audio_count += 1
+        if len(self._entries) > self.max_entries:
+            evicted = self._entries.popleft()
+            if evicted.get("audio_url"):
+                self.audio_count -= 1
+        return record
+
+    @property
+    def etag(self) -> str:
+        return f'"{self.epoch}-{self.last_seq}"'
+
+    async def refresh(self):
+        """Reload counters kept by other workers (nothing to do in process)."""
+
+    async def page(self, since: int | None = None, limit: int | None = None) -> list[dict]:
+        """
+        Return entries newest first.
+
+        With since, only entries with seq > since are returned; if there are
+        more than limit of them, the oldest ones come back first so a client
+        can keep paging forward from the highest seq it received without gaps.
+        Without since, the newest limit entries are returned.
+        """
+        available = len(self._entries)
+        if since is not None:
+            available = min(available, max(self.last_seq - since, 0))
+        count = available if limit is None else min(limit, available)
+
+        if since is not None and count < available:
+            # Skip the newest entries that belong to the next page
+            newest = islice(reversed(self._entries), available - count, available)
+        else:
+            newest = islice(reversed(self._entries), count)
+        return list(newest)
@@ -0,0 +1,208 @@
+"""
+Durable conversation history in SQLite.
+
+Records are queued on the request path and written by a background task in
+batches (one transaction per batch, off the event loop), so persistence never
+adds webhook latency. The database runs in WAL mode so searches don't block
+the writer, and an FTS5 index covers transcripts, suggestions and phrases.
+"""
+
+import asyncio
+import logging
+import sqlite3
+import threading
+from datetime import datetime
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS conversations (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    record_id TEXT,
+    session_id TEXT,
+    ts REAL NOT NULL,
+    timestamp TEXT NOT NULL,
+    original TEXT,
+    suggestion TEXT,
+    portuguese_phrase TEXT,
+    audio_url TEXT
+);
+CREATE INDEX IF NOT EXISTS conversations_ts ON conversations (ts);
+CREATE INDEX IF NOT EXISTS conversations_session_ts ON conversations (session_id, ts);
+CREATE VIRTUAL TABLE IF NOT EXISTS conversations_fts USING fts5(
+    original, suggestion, portuguese_phrase,
+    content='conversations', content_rowid='id'
+);
+CREATE TRIGGER IF NOT EXISTS conversations_ai AFTER INSERT ON conversations BEGIN
+    INSERT INTO conversations_fts (rowid, original, suggestion, portuguese_phrase)
+    VALUES (new.id, new.original, new.suggestion, new.portuguese_phrase);
+END;
+"""
+
+log = logging.getLogger(__name__)
+
+COLUMNS = ("record_id", "session_id", "timestamp", "original", "suggestion", "portuguese_phrase", "audio_url")
+
+
+def fts_query(text: str) -> str:
+    """Turn free text into an FTS5 query matching all words (quoted, so user input can't break syntax)."""
+    return " ".join('"' + word.replace('"', '""') + '"' for word in text.split())
+
+
+def parse_time(value: str | None) -> float | None:
+    """Accept an ISO-8601 datetime or epoch seconds."""
+    if not value:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        return datetime.fromisoformat(value).timestamp()
+
+
+class HistoryDatabase:
+    """SQLite-backed history with a batched background writer."""
+
+    def __init__(self, path: str, batch_size: int, flush_seconds: float, queue_size: int):
+        self.path = path
+        self.batch_size = batch_size
+        self.flush_seconds = flush_seconds
+        self.written = 0
+        self.dropped = 0
+        self.batches = 0
+        self.queue_size = queue_size
+        self._queue: asyncio.Queue | None = None
+        self._writer_conn: sqlite3.Connection | None = None
+        self._reader_conn: sqlite3.Connection | None = None
+        self._reader_lock = threading.Lock()
+        self._writer_task: asyncio.Task | None = None
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = sqlite3.connect(self.path, check_same_thread=False)
+        conn.row_factory = sqlite3.Row
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.execute("PRAGMA busy_timeout=5000")
+        return conn
+
+    async def open(self):
+        """Create the schema and start the background writer."""
+        def _open():
+            self._writer_conn = self._connect()
+            self._writer_conn.executescript(SCHEMA)
+            self._reader_conn = self._connect()
+        await asyncio.to_thread(_open)
+        self._queue = asyncio.Queue(maxsize=self.queue_size)
+        self._writer_task = asyncio.create_task(self._run_writer())
+
+    async def close(self):
+        """Flush queued records and close the database."""
+        if self._writer_task is not None:
+            await self._queue.put(None)
+            await self._writer_task
+        for conn in (self._writer_conn, self._reader_conn):
+            if conn is not None:
+                conn.close()
+
+    def enqueue(self, record: dict):
+        """Queue a record for writing. Never blocks; drops (and counts) if the queue is full."""
+        if self._queue is None:
+            self.dropped += 1
+            return
+        try:
+            self._queue.put_nowait(record)
+        except asyncio.QueueFull:
+            self.dropped += 1
+
+    async def _run_writer(self):
+        stop = False
+        while not stop:
+            record = await self._queue.get()
+            if record is None:
+                return
+            # Linger briefly so records arriving together share one transaction
+            await asyncio.sleep(self.flush_seconds)
+            batch = [record]
+            while len(batch) < self.batch_size and not self._queue.empty():
+                record = self._queue.get_nowait()
+                if record is None:
+                    # Shutdown marker: write this last batch, then stop
+                    stop = True
+                    break
+                batch.append(record)
+            try:
+                await asyncio.to_thread(self._write_batch, batch)
+            except sqlite3.Error as e:
+                log.error("History DB write error", extra={"error": str(e), "records": len(batch)})
+
+    def _write_batch(self, batch: list[dict]):
+        rows = []
+        for record in batch:
+            timestamp = record.get("timestamp") or datetime.now().isoformat()
+            rows.append((
+                record.get("id"),
+                record.get("session_id"),
+                datetime.fromisoformat(timestamp).timestamp(),
+                timestamp,
+                record.get("original"),
+                record.get("suggestion"),
+                record.get("portuguese_phrase"),
+                record.get("audio_url"),
+            ))
+        with self._writer_conn:
+            self._writer_conn.executemany(
+                "INSERT INTO conversations (record_id, session_id, ts, timestamp, original, "
+                "suggestion, portuguese_phrase, audio_url) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                rows,
+            )
+        self.written += len(rows)
+        self.batches += 1
+
+    def _filters(self, q, session_id, since, until) -> tuple[str, str, list]:
+        joins, where, params = "", [], []
+        # A blank q is no text filter (an empty MATCH is an FTS5 syntax error)
+        match = fts_query(q) if q else ""
+        if match:
+            joins = "JOIN conversations_fts f ON f.rowid = c.id"
+            where.append("conversations_fts MATCH ?")
+            params.append(match)
+        if session_id:
+            where.append("c.session_id = ?")
+            params.append(session_id)
+        if since is not None:
+            where.append("c.ts >= ?")
+            params.append(since)
+        if until is not None:
+            where.append("c.ts < ?")
+            params.append(until)
+        return joins, ("WHERE " + " AND ".join(where)) if where else "", params
+
+    def _query(self, sql: str, params: list) -> list[dict]:
+        with self._reader_lock:
+            return [dict(row) for row in self._reader_conn.execute(sql, params)]
+
+    async def search(self, q: str | None = None, session_id: str | None = None,
+                     since: float | None = None, until: float | None = None,
+                     limit: int = 50) -> list[dict]:
+        """Past records matching text, session and time range, newest first."""
+        joins, where, params = self._filters(q, session_id, since, until)
+        sql = (f"SELECT c.record_id AS id, {', '.join('c.' + col for col in COLUMNS[1:])} "
+               f"FROM conversations c {joins} {where} ORDER BY c.ts DESC LIMIT ?")
+        return await asyncio.to_thread(self._query, sql, params + [limit])
+
+    async def top_phrases(self, q: str | None = None, session_id: str | None = None,
+                          since: float | None = None, until: float | None = None,
+                          limit: int = 50) -> list[dict]:
+        """Most frequently suggested Portuguese phrases, with counts and last use."""
+        joins, where, params = self._filters(q, session_id, since, until)
+        where = (where + " AND" if where else "WHERE") + " c.portuguese_phrase IS NOT NULL"
+        sql = (f"SELECT c.portuguese_phrase AS phrase, COUNT(*) AS count, MAX(c.timestamp) AS last_used "
+               f"FROM conversations c {joins} {where} "
+               f"GROUP BY c.portuguese_phrase ORDER BY count DESC, last_used DESC LIMIT ?")
+        return await asyncio.to_thread(self._query, sql, params + [limit])
+
+    def stats(self) -> dict:
+        return {
+            "path": self.path,
+            "queued": self._queue.qsize() if self._queue is not None else 0,
+            "written": self.written,
+            "batches": self.batches,
+            "dropped": self.dropped,
+        }
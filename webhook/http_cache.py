@@ -0,0 +1,173 @@
+"""
+HTTP caching helpers: conditional GET, byte ranges and precompressed assets.
+
+Audio clips are content-addressed, so their IDs double as strong ETags and
+they can be cached as immutable; byte ranges let <audio> elements seek without
+refetching the whole clip. Static assets are read and compressed once at
+startup (gzip, plus brotli when the optional brotli package is installed), so
+serving them is a dictionary lookup.
+"""
+
+import gzip
+import hashlib
+
+from fastapi import Request
+from fastapi.responses import Response
+
+try:
+    import brotli
+except ImportError:  # optional: gzip only
+    brotli = None
+
+IMMUTABLE = "public, max-age=31536000, immutable"
+
+# Audio formats Kokoro can produce directly; "opus" comes back in an Ogg container
+AUDIO_MEDIA_TYPES = {"mp3": "audio/mpeg", "opus": "audio/ogg"}
+AUDIO_EXTENSIONS = {"mp3": "mp3", "opus": "ogg"}
+_ACCEPT_FORMATS = {
+    "audio/mpeg": "mp3", "audio/mp3": "mp3",
+    "audio/ogg": "opus", "audio/opus": "opus", "application/ogg": "opus",
+}
+
+
+def etag_matches(request: Request, etag: str) -> bool:
+    """True if If-None-Match names this ETag (or is *)."""
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    candidates = {tag.strip().removeprefix("W/") for tag in header.split(",")}
+    return "*" in candidates or etag in candidates
+
+
+def negotiate_audio_format(accept: str, allowed: list[str], default: str) -> str:
+    """
+    Pick the audio format to serve for an Accept header.
+
+    The stored (default) format wins whenever the client accepts it at all,
+    directly or through audio/* or */*, so playing a clip never costs a
+    re-encode; another allowed format (highest q first) is chosen only when
+    the client rules the default out.
+    """
+    accepted: dict[str, float] = {}
+    wildcard = None
+    for part in accept.split(","):
+        media, *params = [p.strip() for p in part.split(";")]
+        media = media.lower()
+        if not media:
+            continue
+        q = 1.0
+        for param in params:
+            if param.startswith("q="):
+                try:
+                    q = float(param[2:])
+                except ValueError:
+                    q = 0.0
+        if media in ("*/*", "audio/*"):
+            wildcard = max(wildcard or 0.0, q)
+        elif media in _ACCEPT_FORMATS:
+            fmt = _ACCEPT_FORMATS[media]
+            accepted[fmt] = max(accepted.get(fmt, 0.0), q)
+    if not accepted and wildcard is None:
+        # No (usable) Accept header: anything goes
+        return default
+    quality = {fmt: accepted.get(fmt, wildcard or 0.0) for fmt in allowed}
+    if accepted.get(default, wildcard or 0.0) > 0:
+        return default
+    candidates = [fmt for fmt in allowed if quality[fmt] > 0]
+    return max(candidates, key=quality.get) if candidates else default
+
+
+def parse_range(header: str | None, size: int) -> tuple[int, int] | None:
+    """
+    Parse a single "bytes=" range into inclusive (start, end).
+
+    Returns None when there is no usable range (serve the whole body) and
+    raises ValueError when the range can't be satisfied. Multi-range requests
+    are answered with the whole body, which the spec allows.
+    """
+    if not header or not header.startswith("bytes=") or "," in header:
+        return None
+    first, _, last = header[len("bytes="):].strip().partition("-")
+    try:
+        if first:
+            start = int(first)
+            end = min(int(last), size - 1) if last else size - 1
+        elif last:
+            # Suffix range: the final N bytes
+            start = max(size - int(last), 0)
+            end = size - 1
+        else:
+            return None
+    except ValueError:
+        return None
+    if start >= size or start > end:
+        raise ValueError("unsatisfiable range")
+    return start, end
+
+
+def ranged_response(request: Request, body: bytes | None, size: int, media_type: str,
+                    headers: dict, read_range=None) -> Response:
+    """
+    Answer a GET for a content-stable body, honouring Range and If-Range.
+
+    read_range(start, length) supplies partial bytes when body is None
+    (e.g. a clip on disk).
+    """
+    headers = {**headers, "Accept-Ranges": "bytes"}
+    range_header = request.headers.get("range")
+    if_range = request.headers.get("if-range")
+    if if_range and if_range != headers.get("ETag"):
+        range_header = None
+    try:
+        byte_range = parse_range(range_header, size)
+    except ValueError:
+        return Response(status_code=416, headers={**headers, "Content-Range": f"bytes */{size}"})
+    if byte_range is None:
+        if body is None:
+            body = read_range(0, size)
+        return Response(content=body, media_type=media_type, headers=headers)
+
+    start, end = byte_range
+    length = end - start + 1
+    chunk = body[start:end + 1] if body is not None else read_range(start, length)
+    headers["Content-Range"] = f"bytes {start}-{end}/{size}"
+    return Response(content=chunk, status_code=206, media_type=media_type, headers=headers)
+
+
+def read_file_range(path: str, start: int, length: int) -> bytes:
+    with open(path, "rb") as f:
+        f.seek(start)
+        return f.read(length)
+
+
+class StaticAsset:
+    """A file loaded and precompressed once, served with ETag revalidation."""
+
+    def __init__(self, path: str, media_type: str):
+        with open(path, "rb") as f:
+            body = f.read()
+        self.media_type = media_type
+        self.etag = '"' + hashlib.sha256(body).hexdigest()[:16] + '"'
+        self.variants: dict[str, bytes] = {"identity": body, "gzip": gzip.compress(body, compresslevel=9)}
+        if brotli is not None:
+            self.variants["br"] = brotli.compress(body, quality=11)
+
+    def encoding_for(self, accept_encoding: str) -> str:
+        accepted = {part.split(";")[0].strip() for part in accept_encoding.lower().split(",")}
+        for encoding in ("br", "gzip"):
+            if encoding in self.variants and encoding in accepted:
+                return encoding
+        return "identity"
+
+    def response(self, request: Request) -> Response:
+        # no-cache: browsers keep the asset but revalidate, which costs a 304
+        headers = {"ETag": self.etag, "Cache-Control": "no-cache", "Vary": "Accept-Encoding"}
+        if etag_matches(request, self.etag):
+            return Response(status_code=304, headers=headers)
+        encoding = self.encoding_for(request.headers.get("accept-encoding", ""))
+        if encoding != "identity":
+            headers["Content-Encoding"] = encoding
+        return Response(content=self.variants[encoding], media_type=self.media_type, headers=headers)
+
+    def stats(self) -> dict:
+        return {encoding: len(body) for encoding, body in self.variants.items()}
@@ -0,0 +1,129 @@
+"""
+Local language and filler detection for transcript segments.
+
+A stopword and character n-gram vote tells Portuguese from English well enough
+to skip the LLM for segments the coach would answer with "No action needed"
+anyway (plain English, pleasantries, filler). Anything ambiguous is passed
+through to the model.
+"""
+
+import re
+
+PORTUGUESE_STOPWORDS = frozenset("""
+    a o as os um uma uns umas de da do das dos em na no nas nos por pra pro para
+    com sem que quem qual quando onde como porque porquê mas mais muito muita
+    muitos muitas pouco já ainda também só sempre nunca hoje ontem agora depois
+    antes aqui ali lá isso isto aquilo esse essa este esta ele ela eles elas eu
+    você vocês voce nós gente me te se lhe nos meu minha meus minhas seu sua teu
+    tua dele dela é e foi era ser estar está estou estava tá ter tem tenho tinha
+    fazer faz fiz vai vou ir pode posso quer quero sei sabe acho coisa tudo nada
+    bem não sim né então tipo ao à às pelo pela num numa
+""".split())
+
+ENGLISH_STOPWORDS = frozenset("""
+    the a an of to in on at for from with without and or but so because if then
+    that this these those there here what who which when where why how i i'm i've
+    i'd i'll me my mine you you're your yours he she it it's we we're our they
+    they're their them is are was were be been being have has had do does did
+    don't didn't can can't could would should will won't just really very about
+    like know think going get got go went yeah yes no not okay ok well some any
+    all more most much many time years year work working been
+""".split())
+
+FILLER_WORDS = frozenset("""
+    ok okay yeah yes yep yup no nope uh um uhm hmm mhm ah oh eh huh hi hey hello
+    bye thanks thank you cool nice right sure great alright wow lol haha
+    oi olá ola tchau obrigado obrigada valeu beleza legal tá ta né ne sim não nao
+    uhum aham ahn é e então entao tipo nossa certo claro show tudo bem bom boa dia
+    tarde noite
+""".split())
+
+PORTUGUESE_CHARS = frozenset("áàâãéêíóôõúçÁÀÂÃÉÊÍÓÔÕÚÇ")
+PORTUGUESE_NGRAMS = ("ção", "ções", "ões", "ão", "nh", "lh", "qu", "ei")
+ENGLISH_NGRAMS = ("th", "wh", "ing", "'s", "'t", "ck", "ly")
+
+_WORD_RE = re.compile(r"[a-zà-ÿ']+")
+
+
+def tokenize(text: str) -> list[str]:
+    return _WORD_RE.findall(text.lower())
+
+
+def portuguese_score(text: str) -> float:
+    """
+    Estimate how likely the text is Portuguese rather than English (0.0 - 1.0).
+
+    Each stopword counts as a full vote, each character n-gram cue as half a
+    vote, and accented letters count strongly for Portuguese. Text with no
+    evidence either way scores 0.5.
+    """
+    tokens = tokenize(text)
+    pt = sum(1 for t in tokens if t in PORTUGUESE_STOPWORDS)
+    en = sum(1 for t in tokens if t in ENGLISH_STOPWORDS)
+
+    lowered = text.lower()
+    pt += 0.5 * sum(lowered.count(g) for g in PORTUGUESE_NGRAMS)
+    en += 0.5 * sum(lowered.count(g) for g in ENGLISH_NGRAMS)
+    pt += 2 * sum(1 for c in text if c in PORTUGUESE_CHARS)
+
+    return (pt + 1) / (pt + en + 2)
+
+
+def looks_portuguese(phrase: str) -> bool:
+    """True if a phrase reads as Portuguese (used to tell a suggestion from its English gloss)."""
+    return any(c in PORTUGUESE_CHARS for c in phrase) or portuguese_score(phrase) > 0.5
+
+
+def filler_ratio(text: str) -> float:
+    """Share of words that are filler or pleasantries (1.0 for no words at all)."""
+    tokens = tokenize(text)
+    if not tokens:
+        return 1.0
+    return sum(1 for t in tokens if t in FILLER_WORDS) / len(tokens)
+
+
+def classify(text: str) -> tuple[str, float]:
+    """Label a segment as "filler", "english" or "portuguese", with a confidence."""
+    filler = filler_ratio(text)
+    if filler == 1.0:
+        return "filler", 1.0
+    score = portuguese_score(text)
+    if score >= 0.5:
+        return "portuguese", score
+    return "english", 1.0 - score
+
+
+class FastPathFilter:
+    """Decides which segments can skip the LLM, and counts how often it does."""
+
+    def __init__(self, threshold: float, enabled: bool = True):
+        self.threshold = threshold
+        self.enabled = enabled
+        self.checked = 0
+        self.skipped_english = 0
+        self.skipped_filler = 0
+
+    def should_skip(self, text: str) -> bool:
+        """True if the segment is confidently English or filler."""
+        if not self.enabled:
+            return False
+        self.checked += 1
+        label, confidence = classify(text)
+        if label == "portuguese" or confidence < self.threshold:
+            return False
+        if label == "filler":
+            self.skipped_filler += 1
+        else:
+            self.skipped_english += 1
+        return True
+
+    def stats(self) -> dict:
+        skipped = self.skipped_english + self.skipped_filler
+        return {
+            "enabled": self.enabled,
+            "threshold": self.threshold,
+            "checked": self.checked,
+            "skipped_english": self.skipped_english,
+            "skipped_filler": self.skipped_filler,
+            "skip_rate": round(skipped / self.checked, 3) if self.checked else 0.0,
+        }
@@ -0,0 +1,232 @@
+"""
+Pre-warmed phrase audio.
+
+Suggestions keep coming back to the same follow-ups, so a library of likely
+phrases (a configurable list, the prompt's examples and the most frequent
+phrases from history) is synthesized ahead of time by a background task with
+limited concurrency. Clips are persisted to a directory (with a manifest of
+the Kokoro source that made them) and loaded into the TTS cache at startup,
+so hot phrases cost no Kokoro round trip from the very first webhook. The
+library is rebuilt periodically as history changes.
+"""
+
+import asyncio
+import json
+import logging
+import os
+import re
+import time
+
+from tts_cache import TTSCache, normalize_phrase, phrase_key, variant_key
+
+log = logging.getLogger(__name__)
+
+# Skips the "[Suggested response ...]" placeholder in the format description
+_SAY_PATTERN = re.compile(r'Say:\s*"([^"\[][^"]*)"')
+# Clip files (and manifest keys): <sha256>.<format>
+_CLIP_NAME = re.compile(r"^[0-9a-f]{64}\.\w+$")
+
+
+def load_phrase_file(path: str) -> list[str]:
+    """One phrase per line; blank lines and # comments are ignored. A missing file is empty."""
+    try:
+        with open(path, encoding="utf-8") as f:
+            lines = [line.strip() for line in f]
+    except FileNotFoundError:
+        return []
+    return [line for line in lines if line and not line.startswith("#")]
+
+
+def prompt_phrases(prompt: str) -> list[str]:
+    """The 💬 Say: "..." example phrases in a system prompt."""
+    return _SAY_PATTERN.findall(prompt)
+
+
+def unique_phrases(phrases: list[str]) -> list[str]:
+    """Drop phrases that normalize to one already listed, keeping the first spelling."""
+    seen = set()
+    unique = []
+    for phrase in phrases:
+        normalized = normalize_phrase(phrase)
+        if normalized and normalized not in seen:
+            seen.add(normalized)
+            unique.append(phrase)
+    return unique
+
+
+class PhraseLibrary:
+    """
+    Phrases kept synthesized (in the TTS cache and on disk) ahead of demand.
+
+    manifest.json records the phrase and where each clip came from (Kokoro
+    URL, model and voice); clips that aren't in it, or were made by a
+    different source, are never served. Workers sharing the directory merge
+    their entries into the manifest, and a refresh only removes clips this
+    process listed and no longer wants. Library clips can still be evicted
+    from the TTS cache, so clip() lets the synthesis path fall back to the
+    file before calling Kokoro.
+    """
+
+    MANIFEST = "manifest.json"
+
+    def __init__(self, directory: str, cache: TTSCache, synthesize, voice: str,
+                 response_format: str, concurrency: int, source: dict):
+        self.directory = directory
+        self.cache = cache
+        self.synthesize = synthesize
+        self.voice = voice
+        self.response_format = response_format
+        self.concurrency = max(1, concurrency)
+        self.source = {**source, "voice": voice}
+        self.phrases = 0
+        self.loaded = 0
+        self.synthesized = 0
+        self.failed = 0
+        self.fallbacks = 0
+        self.refreshes = 0
+        self.last_refresh: float | None = None
+        # cache key -> manifest entry, for clips made by the current source
+        self._clips: dict[str, dict] = {}
+        # Clips this process listed at load or its last refresh; only these are ever removed by it
+        self._owned: set[str] = set()
+        os.makedirs(directory, exist_ok=True)
+
+    def _path(self, cache_key: str) -> str:
+        return os.path.join(self.directory, cache_key)
+
+    def _read_all_entries(self) -> dict[str, dict]:
+        """Every manifest entry, whichever worker or source wrote it."""
+        try:
+            with open(self._path(self.MANIFEST), encoding="utf-8") as f:
+                manifest = json.load(f)
+        except (OSError, ValueError):
+            return {}
+        if not isinstance(manifest, dict):
+            return {}
+        return {cache_key: entry for cache_key, entry in manifest.items()
+                if _CLIP_NAME.match(cache_key) and isinstance(entry, dict)}
+
+    def _read_manifest(self) -> dict[str, dict]:
+        """Manifest entries whose clip exists and was made by the current source."""
+        return {
+            cache_key: entry for cache_key, entry in self._read_all_entries().items()
+            if cache_key.endswith(f".{self.response_format}")
+            and all(entry.get(k) == v for k, v in self.source.items())
+            and os.path.exists(self._path(cache_key))
+        }
+
+    def _write_manifest(self, manifest: dict[str, dict]):
+        tmp_path = self._path(f"{self.MANIFEST}.{os.getpid()}.tmp")
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, ensure_ascii=False)
+        os.replace(tmp_path, self._path(self.MANIFEST))
+
+    def _read_clip(self, cache_key: str) -> bytes | None:
+        try:
+            with open(self._path(cache_key), "rb") as f:
+                return f.read()
+        except FileNotFoundError:
+            self._clips.pop(cache_key, None)
+            return None
+
+    def load(self) -> int:
+        """Put every persisted clip from the current source into the TTS cache. Returns the number loaded."""
+        self._clips = self._read_manifest()
+        self._owned = set(self._clips)
+        loaded = 0
+        for cache_key in list(self._clips):
+            audio = self._read_clip(cache_key)
+            if audio:
+                self.cache.put(cache_key, audio)
+                loaded += 1
+        self.loaded += loaded
+        return loaded
+
+    def clip(self, text: str, voice: str, response_format: str) -> bytes | None:
+        """The persisted clip for a phrase if it is in the library, else None."""
+        cache_key = variant_key(phrase_key(text, voice), response_format)
+        if cache_key not in self._clips:
+            return None
+        audio = self._read_clip(cache_key)
+        if audio:
+            self.fallbacks += 1
+        return audio
+
+    async def warm(self, phrases: list[str]):
+        """Make sure every phrase is cached and persisted; drop clips for phrases no longer listed."""
+        semaphore = asyncio.Semaphore(self.concurrency)
+        # Pick up clips another worker sharing the directory has made since
+        self._clips = {**self._read_manifest(), **self._clips}
+        keep = {}
+
+        async def warm_one(phrase: str):
+            cache_key = variant_key(phrase_key(phrase, self.voice), self.response_format)
+            entry = self._clips.get(cache_key)
+            if entry is not None:
+                if self.cache.get(cache_key) is not None:
+                    keep[cache_key] = entry
+                    return
+                audio = self._read_clip(cache_key)
+                if audio:
+                    self.cache.put(cache_key, audio)
+                    self.loaded += 1
+                    keep[cache_key] = entry
+                    return
+            async with semaphore:
+                _, audio = await self.synthesize(phrase, self.voice, self.response_format)
+            if not audio:
+                self.failed += 1
+                return
+            # Per process, as another worker may be writing the same clip
+            tmp_path = f"{self._path(cache_key)}.{os.getpid()}.tmp"
+            with open(tmp_path, "wb") as f:
+                f.write(audio)
+            os.replace(tmp_path, self._path(cache_key))
+            keep[cache_key] = {"phrase": phrase, **self.source}
+            self.synthesized += 1
+
+        phrases = unique_phrases(phrases)
+        await asyncio.gather(*(warm_one(phrase) for phrase in phrases))
+        dropped = self._owned - keep.keys()
+        # Merge with what other workers wrote meanwhile, rather than last writer wins
+        manifest = {cache_key: entry for cache_key, entry in self._read_all_entries().items()
+                    if cache_key not in dropped}
+        manifest.update(keep)
+        self._write_manifest(manifest)
+        self._clips = {cache_key: entry for cache_key, entry in manifest.items()
+                       if cache_key in keep or cache_key in self._clips}
+        self._owned = set(keep)
+        for cache_key in dropped:
+            _remove(self._path(cache_key))
+        self.phrases = len(phrases)
+        self.refreshes += 1
+        self.last_refresh = time.time()
+
+    async def run(self, gather_phrases, refresh_seconds: float):
+        """Background task: rebuild the library now and every refresh_seconds."""
+        while True:
+            try:
+                await self.warm(await gather_phrases())
+            except Exception as e:
+                log.warning("Phrase library refresh failed", extra={"error": str(e)})
+            await asyncio.sleep(refresh_seconds)
+
+    def stats(self) -> dict:
+        return {
+            "directory": self.directory,
+            "phrases": self.phrases,
+            "clips": len(self._clips),
+            "loaded": self.loaded,
+            "synthesized": self.synthesized,
+            "failed": self.failed,
+            "fallbacks": self.fallbacks,
+            "refreshes": self.refreshes,
+            "last_refresh": self.last_refresh,
+        }
+
+
+def _remove(path: str):
+    try:
+        os.remove(path)
+    except FileNotFoundError:
+        pass
@@ -4,42 +4,270 @@ Receives live transcripts from Omi and returns translations + follow-up suggesti
 """
 
 import os
+import asyncio
+import logging
 import httpx
 import uuid
 import re
 import json
-from datetime import datetime, timedelta
-from fastapi import FastAPI, Request, HTTPException
-from fastapi.responses import JSONResponse, Response, HTMLResponse
-from pydantic import BaseModel
+import hashlib
+import time
+from contextlib import asynccontextmanager
+from datetime import datetime
+from fastapi import FastAPI, Request, HTTPException, Query
+from fastapi.responses import JSONResponse, Response, HTMLResponse, FileResponse, StreamingResponse
+from pydantic import BaseModel, ValidationError
 from typing import Optional
 import openai
 from prompts import REALTIME_SYSTEM_PROMPT
-
-# Initialize
-app = FastAPI(title="Bilingual Conversation Coach")
-client = openai.OpenAI(api_key=os.getenv("OPENAI_API_KEY"))
+from tts_cache import TTSCache, phrase_key, normalize_phrase, variant_key
+from language import FastPathFilter, looks_portuguese
+from sessions import Session, SessionTable, DEFAULT_SESSION
+from events import EventBroadcaster
+from history import ConversationHistory
+from history_db import HistoryDatabase, parse_time
+from lru import LRUCache
+from translation import (
+    TRANSLATE_SYSTEM_PROMPT, BATCH_SYSTEM_PROMPT,
+    estimate_tokens, numbered_prompt, pack_batches, parse_numbered,
+)
+from audio_store import AudioStore, DiskAudioStore
+from state import StateBackend, SQLiteState
+from http_cache import (
+    AUDIO_EXTENSIONS, AUDIO_MEDIA_TYPES, IMMUTABLE, StaticAsset,
+    etag_matches, negotiate_audio_format, ranged_response, read_file_range,
+)
+from metrics import MetricsRegistry
+from logs import setup_logging
+from breaker import CircuitBreaker, CircuitOpenError
+from admission import AdmissionController, Deadline, Shed
+from phrase_library import PhraseLibrary, load_phrase_file, prompt_phrases
+
+# Logging: structured and queue-backed, so handlers never block on stdout.
+# LOG_SAMPLE_RATE thins out high-volume per-request lines (0.1 = keep 10%).
+LOG_LEVEL = os.getenv("LOG_LEVEL", "INFO")
+LOG_FORMAT = os.getenv("LOG_FORMAT", "json")  # json | text
+LOG_SAMPLE_RATE = float(os.getenv("LOG_SAMPLE_RATE", "1.0"))
+log_listener = setup_logging(LOG_LEVEL, LOG_FORMAT, LOG_SAMPLE_RATE)
+log = logging.getLogger("coach")
+
+# LLM Configuration
+LLM_MODEL = os.getenv("LLM_MODEL", "gpt-4o-mini")  # Fast and cheap for real-time
+LLM_MAX_CONCURRENCY = int(os.getenv("LLM_MAX_CONCURRENCY", "8"))
+LLM_TIMEOUT_SECONDS = float(os.getenv("LLM_TIMEOUT_SECONDS", "15"))
 
 # TTS Configuration
 KOKORO_TTS_URL = os.getenv("KOKORO_TTS_URL", "http://localhost:8880")
+KOKORO_MODEL = "kokoro"
 BASE_URL = os.getenv("BASE_URL", "https://omi.apps.hilo.ca")
 
-# Audio storage (in-memory, clears on restart)
-audio_cache: dict[str, dict] = {}
-AUDIO_EXPIRY_MINUTES = 30
-
-# Conversation history storage
-conversation_history: list[dict] = []
-MAX_HISTORY = 100
+# Kokoro connection pool (one client shared by every TTS call)
+KOKORO_MAX_CONNECTIONS = int(os.getenv("KOKORO_MAX_CONNECTIONS", "20"))
+KOKORO_MAX_KEEPALIVE = int(os.getenv("KOKORO_MAX_KEEPALIVE", "10"))
+KOKORO_KEEPALIVE_EXPIRY = float(os.getenv("KOKORO_KEEPALIVE_EXPIRY", "60"))
+KOKORO_CONNECT_TIMEOUT = float(os.getenv("KOKORO_CONNECT_TIMEOUT", "5"))
+KOKORO_READ_TIMEOUT = float(os.getenv("KOKORO_READ_TIMEOUT", "30"))
+KOKORO_WRITE_TIMEOUT = float(os.getenv("KOKORO_WRITE_TIMEOUT", "10"))
+KOKORO_POOL_TIMEOUT = float(os.getenv("KOKORO_POOL_TIMEOUT", "5"))
+# Overall budget for one synthesis call (connect + write + read)
+KOKORO_DEADLINE_SECONDS = float(os.getenv("KOKORO_DEADLINE_SECONDS", "10"))
+
+# Circuit breakers: open after BREAKER_FAILURE_RATE of at least BREAKER_MIN_CALLS
+# calls in the window fail, then probe again after BREAKER_OPEN_SECONDS
+BREAKER_WINDOW_SECONDS = float(os.getenv("BREAKER_WINDOW_SECONDS", "30"))
+BREAKER_MIN_CALLS = int(os.getenv("BREAKER_MIN_CALLS", "5"))
+BREAKER_FAILURE_RATE = float(os.getenv("BREAKER_FAILURE_RATE", "0.5"))
+BREAKER_OPEN_SECONDS = float(os.getenv("BREAKER_OPEN_SECONDS", "15"))
+kokoro_breaker = CircuitBreaker("kokoro", BREAKER_WINDOW_SECONDS, BREAKER_MIN_CALLS,
+                                BREAKER_FAILURE_RATE, BREAKER_OPEN_SECONDS)
+openai_breaker = CircuitBreaker("openai", BREAKER_WINDOW_SECONDS, BREAKER_MIN_CALLS,
+                                BREAKER_FAILURE_RATE, BREAKER_OPEN_SECONDS)
+
+tts_http_client: httpx.AsyncClient | None = None
+
+
+def get_tts_client() -> httpx.AsyncClient:
+    """Return the shared, connection-pooled Kokoro client (created on first use)."""
+    global tts_http_client
+    if tts_http_client is None or tts_http_client.is_closed:
+        tts_http_client = httpx.AsyncClient(
+            base_url=KOKORO_TTS_URL,
+            limits=httpx.Limits(
+                max_connections=KOKORO_MAX_CONNECTIONS,
+                max_keepalive_connections=KOKORO_MAX_KEEPALIVE,
+                keepalive_expiry=KOKORO_KEEPALIVE_EXPIRY,
+            ),
+            timeout=httpx.Timeout(
+                connect=KOKORO_CONNECT_TIMEOUT,
+                read=KOKORO_READ_TIMEOUT,
+                write=KOKORO_WRITE_TIMEOUT,
+                pool=KOKORO_POOL_TIMEOUT,
+            ),
+        )
+    return tts_http_client
+
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Open shared clients, the audio sweeper and the phrase library at startup; close them on shutdown."""
+    log_listener.start()
+    get_tts_client()
+    if history_db is not None:
+        await history_db.open()
+    sweeper = asyncio.create_task(state.run_sweeper(AUDIO_SWEEP_INTERVAL_SECONDS))
+    library_task = None
+    if phrase_library is not None:
+        # Persisted clips are cached before the first request; missing ones are made in the background
+        phrase_library.load()
+        library_task = asyncio.create_task(
+            phrase_library.run(library_phrases, PHRASE_LIBRARY_REFRESH_MINUTES * 60))
+    yield
+    sweeper.cancel()
+    if library_task is not None:
+        library_task.cancel()
+    for task in list(pending_audio.values()):
+        task.cancel()
+    events.close()
+    if history_db is not None:
+        await history_db.close()
+    if tts_http_client is not None:
+        await tts_http_client.aclose()
+    await client.close()
+    state.close()
+    log_listener.stop()
 
 
-def cleanup_old_audio():
-    """Remove audio older than expiry time."""
-    now = datetime.now()
-    expired = [k for k, v in audio_cache.items()
-               if now - v["created"] > timedelta(minutes=AUDIO_EXPIRY_MINUTES)]
-    for k in expired:
-        del audio_cache[k]
+# Initialize
+app = FastAPI(title="Bilingual Conversation Coach", lifespan=lifespan)
+client = openai.AsyncOpenAI(api_key=os.getenv("OPENAI_API_KEY"), timeout=LLM_TIMEOUT_SECONDS)
+llm_semaphore = asyncio.Semaphore(LLM_MAX_CONCURRENCY)
+
+# Background TTS: reply to Omi before synthesis finishes; /audio waits briefly for pending clips
+TTS_BACKGROUND = os.getenv("TTS_BACKGROUND", "false").lower() in ("1", "true", "yes")
+AUDIO_PENDING_WAIT_SECONDS = float(os.getenv("AUDIO_PENDING_WAIT_SECONDS", "10"))
+pending_audio: dict[str, asyncio.Task] = {}
+
+# Local pre-filter: skip the LLM for segments that are confidently English or filler
+LANG_FILTER_ENABLED = os.getenv("LANG_FILTER_ENABLED", "true").lower() in ("1", "true", "yes")
+LANG_FILTER_THRESHOLD = float(os.getenv("LANG_FILTER_THRESHOLD", "0.75"))
+fast_path = FastPathFilter(threshold=LANG_FILTER_THRESHOLD, enabled=LANG_FILTER_ENABLED)
+
+# Synthesized phrase cache, shared by /webhook and /tts
+TTS_CACHE_MAX_MB = float(os.getenv("TTS_CACHE_MAX_MB", "64"))
+tts_cache = TTSCache(max_bytes=int(TTS_CACHE_MAX_MB * 1024 * 1024))
+
+# Audio formats: clips are synthesized in AUDIO_FORMAT (mp3 | opus); other
+# AUDIO_FORMATS are made on first request (?format= or Accept) and cached too
+AUDIO_FORMAT = os.getenv("AUDIO_FORMAT", "mp3")
+AUDIO_FORMATS = [f.strip() for f in os.getenv("AUDIO_FORMATS", "mp3,opus").split(",") if f.strip() in AUDIO_MEDIA_TYPES]
+if AUDIO_FORMAT not in AUDIO_FORMATS:
+    AUDIO_FORMATS.insert(0, AUDIO_FORMAT)
+
+# Audio storage: "memory" (clears on restart) or "disk" (spilled to AUDIO_DIR)
+AUDIO_STORAGE = os.getenv("AUDIO_STORAGE", "memory")
+AUDIO_DIR = os.getenv("AUDIO_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "audio"))
+AUDIO_EXPIRY_MINUTES = float(os.getenv("AUDIO_EXPIRY_MINUTES", "30"))
+AUDIO_MAX_ENTRIES = int(os.getenv("AUDIO_MAX_ENTRIES", "2000"))
+AUDIO_MAX_MB = float(os.getenv("AUDIO_MAX_MB", "128"))
+AUDIO_SWEEP_INTERVAL_SECONDS = float(os.getenv("AUDIO_SWEEP_INTERVAL_SECONDS", "60"))
+
+# Conversation history storage (ring buffer with sequence numbers)
+MAX_HISTORY = int(os.getenv("MAX_HISTORY", "100"))
+
+# Per-session settings: table size, idle expiry and context length
+SESSION_MAX = int(os.getenv("SESSION_MAX", "1000"))
+SESSION_IDLE_TTL_MINUTES = float(os.getenv("SESSION_IDLE_TTL_MINUTES", "30"))
+SESSION_CONTEXT_SIZE = int(os.getenv("SESSION_CONTEXT_SIZE", "5"))
+
+# State backend: "memory" keeps audio, history and session context in this
+# process; "sqlite" shares them through STATE_DB_PATH so several workers or
+# replicas (on a shared volume) can serve each other's links and sessions
+STATE_BACKEND = os.getenv("STATE_BACKEND", "memory")
+STATE_DB_PATH = os.getenv("STATE_DB_PATH", os.path.join(os.path.dirname(os.path.abspath(__file__)), "state.db"))
+if STATE_BACKEND == "sqlite":
+    state = SQLiteState(
+        STATE_DB_PATH,
+        ttl_seconds=AUDIO_EXPIRY_MINUTES * 60,
+        max_entries=AUDIO_MAX_ENTRIES,
+        max_bytes=int(AUDIO_MAX_MB * 1024 * 1024),
+        max_history=MAX_HISTORY,
+        context_ttl_seconds=SESSION_IDLE_TTL_MINUTES * 60,
+    )
+elif AUDIO_STORAGE == "disk":
+    state = StateBackend(
+        DiskAudioStore(
+            AUDIO_DIR,
+            ttl_seconds=AUDIO_EXPIRY_MINUTES * 60,
+            max_entries=AUDIO_MAX_ENTRIES,
+            max_bytes=int(AUDIO_MAX_MB * 1024 * 1024),
+        ),
+        ConversationHistory(max_entries=MAX_HISTORY),
+    )
+else:
+    state = StateBackend(
+        AudioStore(
+            ttl_seconds=AUDIO_EXPIRY_MINUTES * 60,
+            max_entries=AUDIO_MAX_ENTRIES,
+            max_bytes=int(AUDIO_MAX_MB * 1024 * 1024),
+        ),
+        ConversationHistory(max_entries=MAX_HISTORY),
+    )
+audio_store = state.audio
+conversation_history = state.history
+
+# Optional durable history (SQLite); writes are batched off the request path
+HISTORY_DB_PATH = os.getenv("HISTORY_DB_PATH", "")
+HISTORY_DB_BATCH_SIZE = int(os.getenv("HISTORY_DB_BATCH_SIZE", "200"))
+HISTORY_DB_FLUSH_SECONDS = float(os.getenv("HISTORY_DB_FLUSH_SECONDS", "0.5"))
+HISTORY_DB_QUEUE_SIZE = int(os.getenv("HISTORY_DB_QUEUE_SIZE", "10000"))
+history_db = HistoryDatabase(
+    HISTORY_DB_PATH,
+    batch_size=HISTORY_DB_BATCH_SIZE,
+    flush_seconds=HISTORY_DB_FLUSH_SECONDS,
+    queue_size=HISTORY_DB_QUEUE_SIZE,
+) if HISTORY_DB_PATH else None
+
+# Live dashboard feed (Server-Sent Events)
+EVENTS_QUEUE_SIZE = int(os.getenv("EVENTS_QUEUE_SIZE", "100"))
+EVENTS_REPLAY_SIZE = int(os.getenv("EVENTS_REPLAY_SIZE", "500"))
+EVENTS_HEARTBEAT_SECONDS = float(os.getenv("EVENTS_HEARTBEAT_SECONDS", "15"))
+events = EventBroadcaster(queue_size=EVENTS_QUEUE_SIZE, replay_size=EVENTS_REPLAY_SIZE)
+
+# Metrics (Prometheus text format at /metrics); gauges are read at scrape time
+metrics = MetricsRegistry()
+webhook_seconds = metrics.histogram("coach_webhook_seconds", "End-to-end /webhook latency.")
+stage_seconds = metrics.histogram("coach_stage_seconds", "Latency of each webhook pipeline stage.", ("stage",))
+webhook_suggestions = metrics.counter("coach_suggestions_total", "Webhook calls answered with a suggestion.")
+webhook_skips = metrics.counter("coach_skips_total", "Webhook calls answered without a suggestion, by reason.", ("reason",))
+webhook_errors = metrics.counter("coach_errors_total", "Webhook calls that failed, by kind.", ("kind",))
+llm_tokens = metrics.counter("coach_llm_tokens_total", "LLM tokens used (estimated when the stream stops early).", ("kind",))
+tts_requests = metrics.counter("coach_tts_requests_total", "Kokoro synthesis calls, by result.", ("result",))
+tts_seconds = metrics.histogram("coach_tts_seconds", "Kokoro synthesis call duration.")
+tts_bytes = metrics.counter("coach_tts_bytes_total", "Audio bytes received from Kokoro.")
+metrics.gauge("coach_audio_store_entries", "Clips in the audio store.", lambda: len(audio_store))
+metrics.gauge("coach_audio_store_bytes", "Bytes held by the audio store.", lambda: audio_store.total_bytes)
+metrics.gauge("coach_tts_cache_entries", "Clips in the TTS cache.", lambda: len(tts_cache))
+metrics.gauge("coach_tts_cache_bytes", "Bytes held by the TTS cache.", lambda: tts_cache.total_bytes)
+metrics.gauge("coach_tts_pending", "Clips being synthesized in the background.", lambda: len(pending_audio))
+metrics.gauge("coach_history_entries", "Conversations in the history buffer.", lambda: len(conversation_history))
+metrics.gauge("coach_sessions_active", "Live webhook sessions.", lambda: sessions.stats()["active"])
+webhook_shed = metrics.counter("coach_shed_total", "Work dropped by admission control or deadlines, by reason.", ("reason",))
+metrics.gauge("coach_admission_inflight", "Coaching requests running.", lambda: admission.inflight)
+metrics.gauge("coach_admission_waiting", "Coaching requests waiting for a slot.", lambda: admission.stats()["waiting"])
+metrics.gauge("coach_kokoro_breaker_open", "1 while the Kokoro circuit breaker is open.",
+              lambda: int(kokoro_breaker.state == "open"))
+metrics.gauge("coach_openai_breaker_open", "1 while the OpenAI circuit breaker is open.",
+              lambda: int(openai_breaker.state == "open"))
+
+
+def record_llm_usage(messages: list[dict], usage, streamed_chunks: int = 0):
+    """Count tokens from the API's usage block, or estimate them if the stream was cut short."""
+    if usage is not None:
+        llm_tokens.inc("prompt", amount=usage.prompt_tokens)
+        llm_tokens.inc("completion", amount=usage.completion_tokens)
+    else:
+        llm_tokens.inc("prompt", amount=sum(estimate_tokens(m["content"]) for m in messages))
+        llm_tokens.inc("completion", amount=streamed_chunks)
 
 
 def extract_portuguese_phrase(suggestion: str) -> str | None:
@@ -61,20 +289,129 @@ def extract_portuguese_phrase(suggestion: str) -> str | None:
         if match:
             phrase = match.group(1)
             # Check if it's Portuguese (not the English translation in parentheses)
-            # Portuguese phrases typically have these markers
-            portuguese_markers = ['você', 'como', 'que', 'isso', 'muito', 'para', 'mais',
-                                  'está', 'isso', 'fazer', 'pode', 'seu', 'sua', 'ter',
-                                  'ser', 'uma', 'não', 'sim', 'bem']
-            has_accents = any(c in phrase for c in 'áàâãéêíóôõúçÁÀÂÃÉÊÍÓÔÕÚÇ')
-            has_portuguese_words = any(w in phrase.lower() for w in portuguese_markers)
-
-            if has_accents or has_portuguese_words:
+            if looks_portuguese(phrase):
                 return phrase
 
     return None
 
 
-async def generate_tts(text: str, voice: str = "pf_dora") -> bytes | None:
+# Errors that mean OpenAI itself is struggling (client errors don't trip the breaker)
+LLM_FAILURES = (asyncio.TimeoutError, openai.APIConnectionError, openai.InternalServerError, openai.RateLimitError)
+
+
+async def call_openai(call, timeout: float):
+    """
+    Run an OpenAI call in an LLM slot under the caller's timeout and the circuit breaker.
+
+    call(abandoned) is given an asyncio.Event. timeout bounds the caller's
+    wait, including the wait for a slot. The breaker judges the call on its
+    own budget (LLM_TIMEOUT_SECONDS from when it got a slot): if the caller
+    times out first, a call already under way is marked abandoned and left
+    to show whether OpenAI answers within budget (streams stop at the first
+    chunk and have no side effects), so a hung OpenAI still trips the breaker
+    however short webhook deadlines are. A cancelled caller (e.g. superseded
+    by a newer segment) cancels the call outright. Raises CircuitOpenError
+    while tripped.
+    """
+    if not openai_breaker.allow():
+        raise CircuitOpenError("openai")
+    started = asyncio.Event()
+    abandoned = asyncio.Event()
+
+    async def timed_call():
+        async with llm_semaphore:
+            started.set()
+            try:
+                result = await asyncio.wait_for(call(abandoned), timeout=LLM_TIMEOUT_SECONDS)
+            except LLM_FAILURES:
+                openai_breaker.record_failure()
+                raise
+        openai_breaker.record_success()
+        return result
+
+    task = asyncio.create_task(timed_call())
+    # The caller may be gone by the time it fails; don't warn about unretrieved errors
+    task.add_done_callback(lambda t: t.cancelled() or t.exception())
+    try:
+        return await asyncio.wait_for(asyncio.shield(task), timeout=timeout)
+    except asyncio.TimeoutError:
+        if started.is_set():
+            abandoned.set()
+        else:
+            # Still waiting for a slot: nothing was sent, so drop it
+            task.cancel()
+        raise
+    except asyncio.CancelledError:
+        task.cancel()
+        raise
+
+
+async def chat_completion(messages: list[dict], timeout: float | None = None, **kwargs) -> str:
+    """
+    Run a chat completion without blocking the event loop.
+
+    At most LLM_MAX_CONCURRENCY calls hit OpenAI at once; the rest wait for a slot.
+    The whole call, including the wait, is bounded by timeout (LLM_TIMEOUT_SECONDS by default).
+    """
+    async def _call(abandoned: asyncio.Event):
+        return await client.chat.completions.create(model=LLM_MODEL, messages=messages, **kwargs)
+
+    response = await call_openai(_call, timeout or LLM_TIMEOUT_SECONDS)
+    record_llm_usage(messages, response.usage)
+    return (response.choices[0].message.content or "").strip()
+
+
+SKIP_MARKER = "No action needed"
+
+
+async def stream_coaching(messages: list[dict], on_phrase=None, timeout: float | None = None) -> str | None:
+    """
+    Stream the coaching completion, stopping as early as the answer allows.
+
+    Returns None as soon as the model starts its "✓ [No action needed]" reply,
+    so skipped segments cost only a few tokens. When the quoted 💬 Say: phrase
+    closes, on_phrase(phrase) is awaited so TTS can start before the rest of
+    the completion arrives. The call is bounded by timeout (LLM_TIMEOUT_SECONDS by default).
+    """
+    async def _stream(abandoned: asyncio.Event):
+        stream = await client.chat.completions.create(
+            model=LLM_MODEL,
+            messages=messages,
+            max_tokens=150,
+            temperature=0.7,
+            stream=True,
+            stream_options={"include_usage": True},
+        )
+        text = ""
+        phrase = None
+        usage = None
+        chunks = 0
+        try:
+            async for chunk in stream:
+                if abandoned.is_set():
+                    # The caller gave up: OpenAI answering is all the breaker needed to know
+                    return None
+                if chunk.usage is not None:
+                    usage = chunk.usage
+                if not chunk.choices:
+                    continue
+                chunks += 1
+                text += chunk.choices[0].delta.content or ""
+                if SKIP_MARKER in text or text.lstrip().startswith("✓"):
+                    return None
+                if phrase is None and on_phrase and text.count('"') >= 2:
+                    phrase = extract_portuguese_phrase(text)
+                    if phrase:
+                        await on_phrase(phrase)
+        finally:
+            await stream.close()
+            record_llm_usage(messages, usage, chunks)
+        return text.strip()
+
+    return await call_openai(_stream, timeout or LLM_TIMEOUT_SECONDS)
+
+
+async def generate_tts(text: str, voice: str = "pf_dora", response_format: str = AUDIO_FORMAT) -> bytes | None:
     """
     Generate speech audio from text using Kokoro TTS.
 
@@ -85,50 +422,444 @@ async def generate_tts(text: str, voice: str = "pf_dora") -> bytes | None:
 
     Voice naming: [lang][gender]_[name]
     p = Portuguese, b = British, a = American, f = female, m = male
+
+    Kokoro encodes response_format ("mp3" or "opus") itself. Returns None straight away while the Kokoro circuit breaker is open.
     """
+    if not kokoro_breaker.allow():
+        tts_requests.inc("rejected")
+        return None
     try:
-        async with httpx.AsyncClient(timeout=30.0) as http_client:
-            response = await http_client.post(
-                f"{KOKORO_TTS_URL}/v1/audio/speech",
+        with tts_seconds.time():
+            response = await asyncio.wait_for(get_tts_client().post(
+                "/v1/audio/speech",
                 json={
-                    "model": "kokoro",
+                    "model": KOKORO_MODEL,
                     "input": text,
                     "voice": voice,
-                    "response_format": "mp3"
+                    "response_format": response_format
                 }
-            )
-            if response.status_code == 200:
-                return response.content
+            ), timeout=KOKORO_DEADLINE_SECONDS)
+        if response.status_code == 200:
+            kokoro_breaker.record_success()
+            tts_requests.inc("ok")
+            tts_bytes.inc(amount=len(response.content))
+            return response.content
+        else:
+            if response.status_code >= 500:
+                kokoro_breaker.record_failure()
             else:
-                print(f"TTS error: {response.status_code} - {response.text}")
-                return None
+                kokoro_breaker.record_success()
+            tts_requests.inc("error")
+            log.warning("TTS error", extra={"status": response.status_code, "body": response.text[:200]})
+            return None
     except Exception as e:
-        print(f"TTS connection error: {e}")
+        kokoro_breaker.record_failure()
+        tts_requests.inc("error")
+        log.warning("TTS connection error", extra={"error": str(e) or type(e).__name__})
+        return None
+
+async def synthesize_phrase(text: str, voice: str = "pf_dora",
+                            response_format: str = AUDIO_FORMAT) -> tuple[str, bytes | None]:
+    """Return (content key, audio) for a phrase, reusing cached audio when possible."""
+    return await tts_cache.get_or_generate(text, voice, generate_phrase_audio, response_format)
+
+
+async def generate_phrase_audio(text: str, voice: str, response_format: str) -> bytes | None:
+    """Audio for a TTS cache miss: the phrase library's copy if it has one, else Kokoro."""
+    if phrase_library is not None:
+        audio = phrase_library.clip(text, voice, response_format)
+        if audio is not None:
+            return audio
+    return await generate_tts(text, voice, response_format)
+
+
+async def store_phrase_audio(phrase: str, voice: str = "pf_dora", reserve: bool = False) -> str | None:
+    """
+    Synthesize (or reuse) audio for a phrase and store it. Returns the audio ID.
+
+    With reserve, the ID is first recorded as pending so other workers asked
+    for the link wait for it (a no-op for in-process stores).
+    """
+    if reserve:
+        await audio_store.reserve(phrase_key(phrase, voice)[:12], phrase, KOKORO_DEADLINE_SECONDS)
+    with stage_seconds.time("tts"):
+        audio_key, audio_data = await synthesize_phrase(phrase, voice)
+    # Content-addressed ID: a repeated phrase reuses the same stored clip
+    audio_id = audio_key[:12]
+    if not audio_data:
+        await audio_store.unreserve(audio_id)
         return None
+    with stage_seconds.time("storage"):
+        is_new = not await audio_store.contains(audio_id)
+        stored = await audio_store.put(audio_id, audio_data, phrase, AUDIO_FORMAT)
+    if stored is None:
+        # Larger than the whole store: no link rather than a dead one
+        log.warning("Audio clip exceeds the store size", extra={"audio_id": audio_id, "bytes": len(audio_data)})
+        await audio_store.unreserve(audio_id)
+        return None
+    if is_new:
+        events.publish("audio", {"audio_id": audio_id, "url": f"{BASE_URL}/audio/{audio_id}"})
+    return audio_id
+
+
+async def schedule_phrase_audio(phrase: str, voice: str = "pf_dora") -> str | None:
+    """
+    Reserve the audio ID for a phrase and synthesize it in the background.
+
+    The ID is derived from the phrase, so it is known before Kokoro answers.
+    Returns None if Kokoro is tripped and no copy of the clip exists.
+    """
+    key = phrase_key(phrase, voice)
+    audio_id = key[:12]
+    if audio_id in pending_audio:
+        return audio_id
+    if (not kokoro_breaker.available() and tts_cache.get(variant_key(key, AUDIO_FORMAT)) is None
+            and not await audio_store.contains(audio_id)):
+        # Don't promise a clip that can't be made; the suggestion goes out text-only
+        return None
+    # Another caller may have started it while the store was checked
+    if audio_id not in pending_audio:
+        task = asyncio.create_task(store_phrase_audio(phrase, voice, reserve=True))
+        pending_audio[audio_id] = task
+        task.add_done_callback(lambda _: pending_audio.pop(audio_id, None))
+    return audio_id
+
+
+# Phrase library: likely phrases synthesized ahead of time and persisted to
+# PHRASE_LIBRARY_DIR, so they are served from the TTS cache from the first webhook
+PHRASE_LIBRARY_ENABLED = os.getenv("PHRASE_LIBRARY_ENABLED", "true").lower() in ("true", "1", "yes")
+PHRASE_LIBRARY_FILE = os.getenv("PHRASE_LIBRARY_FILE", os.path.join(os.path.dirname(os.path.abspath(__file__)), "phrases.txt"))
+PHRASE_LIBRARY_DIR = os.getenv("PHRASE_LIBRARY_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "phrase_library"))
+PHRASE_LIBRARY_TOP_N = int(os.getenv("PHRASE_LIBRARY_TOP_N", "50"))
+PHRASE_LIBRARY_CONCURRENCY = int(os.getenv("PHRASE_LIBRARY_CONCURRENCY", "2"))
+PHRASE_LIBRARY_REFRESH_MINUTES = float(os.getenv("PHRASE_LIBRARY_REFRESH_MINUTES", "60"))
+phrase_library = PhraseLibrary(
+    PHRASE_LIBRARY_DIR,
+    tts_cache,
+    synthesize_phrase,
+    voice="pf_dora",
+    response_format=AUDIO_FORMAT,
+    concurrency=PHRASE_LIBRARY_CONCURRENCY,
+    source={"kokoro_url": KOKORO_TTS_URL, "model": KOKORO_MODEL},
+) if PHRASE_LIBRARY_ENABLED else None
+if phrase_library is not None:
+    metrics.gauge("coach_phrase_library_phrases", "Phrases in the pre-warmed library.", lambda: phrase_library.phrases)
+
+
+async def library_phrases() -> list[str]:
+    """The configured list, the prompt's example phrases and the most frequent phrases from history."""
+    phrases = load_phrase_file(PHRASE_LIBRARY_FILE) + prompt_phrases(REALTIME_SYSTEM_PROMPT)
+    if PHRASE_LIBRARY_TOP_N > 0:
+        if history_db is not None:
+            rows = await history_db.top_phrases(limit=PHRASE_LIBRARY_TOP_N)
+            phrases += [row["phrase"] for row in rows]
+        else:
+            counts: dict[str, int] = {}
+            spelling: dict[str, str] = {}
+            for record in await conversation_history.page():
+                phrase = record.get("portuguese_phrase")
+                if phrase:
+                    normalized = normalize_phrase(phrase)
+                    counts[normalized] = counts.get(normalized, 0) + 1
+                    spelling.setdefault(normalized, phrase)
+            top = sorted(counts, key=counts.get, reverse=True)[:PHRASE_LIBRARY_TOP_N]
+            phrases += [spelling[normalized] for normalized in top]
+    return phrases
+
+
+def requested_audio_format(request: Request, fmt: str | None) -> str:
+    """Format named explicitly (validated), else negotiated from the Accept header."""
+    if fmt:
+        if fmt not in AUDIO_FORMATS:
+            raise HTTPException(status_code=400, detail=f"Unsupported format (choose from {', '.join(AUDIO_FORMATS)})")
+        return fmt
+    return negotiate_audio_format(request.headers.get("accept", ""), AUDIO_FORMATS, AUDIO_FORMAT)
+
+
+def variant_audio_id(audio_id: str, response_format: str) -> str:
+    """Store ID of a clip re-encoded in another format (the primary format keeps the plain ID)."""
+    return audio_id if response_format == AUDIO_FORMAT else f"{audio_id}.{response_format}"
+
+
+async def audio_variant(audio_id: str, response_format: str):
+    """
+    Return (entry, format) for a clip in the requested format.
+
+    Other formats are synthesized once, on first request, and stored next to
+    the primary clip. If that isn't possible the primary clip is returned.
+    """
+    entry = await wait_for_audio(audio_id)
+    if response_format == AUDIO_FORMAT:
+        return entry, AUDIO_FORMAT
+
+    variant = await audio_store.get(variant_audio_id(audio_id, response_format))
+    if variant is None:
+        # Only the default voice can be re-synthesized from the stored phrase
+        if phrase_key(entry.phrase, "pf_dora")[:12] != audio_id:
+            return entry, AUDIO_FORMAT
+        _, audio = await synthesize_phrase(entry.phrase, "pf_dora", response_format)
+        if not audio:
+            return entry, AUDIO_FORMAT
+        variant = await audio_store.put(variant_audio_id(audio_id, response_format), audio, entry.phrase, response_format)
+        if variant is None:
+            return entry, AUDIO_FORMAT
+    return variant, response_format
+
+
+async def wait_for_audio(audio_id: str):
+    """Look up a stored clip, waiting up to AUDIO_PENDING_WAIT_SECONDS if it is still being synthesized."""
+    pending = pending_audio.get(audio_id)
+    if pending is not None:
+        try:
+            await asyncio.wait_for(asyncio.shield(pending), timeout=AUDIO_PENDING_WAIT_SECONDS)
+        except asyncio.TimeoutError:
+            raise HTTPException(status_code=503, detail="Audio is still being generated",
+                                headers={"Retry-After": "1"})
+    elif await audio_store.pending(audio_id):
+        # Another worker is synthesizing it; poll the shared store
+        give_up_at = time.monotonic() + AUDIO_PENDING_WAIT_SECONDS
+        while await audio_store.pending(audio_id):
+            if time.monotonic() >= give_up_at:
+                raise HTTPException(status_code=503, detail="Audio is still being generated",
+                                    headers={"Retry-After": "1"})
+            await asyncio.sleep(0.1)
+
+    entry = await audio_store.get(audio_id)
+    if entry is None:
+        raise HTTPException(status_code=404, detail="Audio not found or expired")
+    return entry
+
+
+# Segment coalescing: merge segments within the window, drop repeats within the dedupe window
+COALESCE_WINDOW_MS = float(os.getenv("COALESCE_WINDOW_MS", "250"))
+DEDUPE_WINDOW_SECONDS = float(os.getenv("DEDUPE_WINDOW_SECONDS", "10"))
+
+# Admission control: bounded concurrent coaching work and wait queues, plus an
+# end-to-end deadline per webhook call; work that can't finish in time is shed
+WEBHOOK_DEADLINE_SECONDS = float(os.getenv("WEBHOOK_DEADLINE_SECONDS", "10"))
+WEBHOOK_MIN_LLM_SECONDS = float(os.getenv("WEBHOOK_MIN_LLM_SECONDS", "1"))
+WEBHOOK_MAX_INFLIGHT = int(os.getenv("WEBHOOK_MAX_INFLIGHT", "16"))
+WEBHOOK_MAX_QUEUED = int(os.getenv("WEBHOOK_MAX_QUEUED", "64"))
+WEBHOOK_MAX_QUEUED_PER_SESSION = int(os.getenv("WEBHOOK_MAX_QUEUED_PER_SESSION", "1"))
+admission = AdmissionController(
+    max_inflight=WEBHOOK_MAX_INFLIGHT,
+    max_queued=WEBHOOK_MAX_QUEUED,
+    max_queued_per_session=WEBHOOK_MAX_QUEUED_PER_SESSION,
+)
+
+
+def record_shed(reason: str):
+    admission.record_shed(reason)
+    webhook_shed.inc(reason)
+
+# Translation: exact-match cache plus batch packing limits for /translate/batch
+TRANSLATION_CACHE_SIZE = int(os.getenv("TRANSLATION_CACHE_SIZE", "10000"))
+TRANSLATE_BATCH_MAX_TOKENS = int(os.getenv("TRANSLATE_BATCH_MAX_TOKENS", "1500"))
+TRANSLATE_BATCH_MAX_LINES = int(os.getenv("TRANSLATE_BATCH_MAX_LINES", "50"))
+TRANSLATE_BATCH_MAX_TEXTS = int(os.getenv("TRANSLATE_BATCH_MAX_TEXTS", "5000"))
+TRANSLATE_BATCH_CONCURRENCY = int(os.getenv("TRANSLATE_BATCH_CONCURRENCY", "4"))
+TRANSLATE_BATCH_TIMEOUT_SECONDS = float(os.getenv("TRANSLATE_BATCH_TIMEOUT_SECONDS", "60"))
+translation_cache = LRUCache(max_entries=TRANSLATION_CACHE_SIZE)
+
+# Coaching response cache: "latest" keys on the transcript alone, "context" also on
+# the preceding context segments, "off" disables it
+COACH_CACHE_POLICY = os.getenv("COACH_CACHE_POLICY", "latest")
+COACH_CACHE_SIZE = int(os.getenv("COACH_CACHE_SIZE", "2000"))
+COACH_CACHE_TTL_SECONDS = float(os.getenv("COACH_CACHE_TTL_SECONDS", "3600"))
+coach_cache = LRUCache(max_entries=COACH_CACHE_SIZE, ttl_seconds=COACH_CACHE_TTL_SECONDS)
+
+
+def coaching_cache_key(transcript: str, recent_context: list[str]) -> str | None:
+    """Cache key for a coaching request under COACH_CACHE_POLICY (None = don't cache)."""
+    if COACH_CACHE_POLICY == "latest":
+        return normalize_phrase(transcript)
+    if COACH_CACHE_POLICY == "context":
+        # recent_context ends with the latest transcript; fingerprint what came before it
+        earlier = "|".join(normalize_phrase(c) for c in recent_context[:-1])
+        return f"{normalize_phrase(transcript)}#{hashlib.sha1(earlier.encode('utf-8')).hexdigest()[:16]}"
+    return None
+
 
-# Store recent context for better suggestions
-conversation_context = []
+# Per-session recent context for better suggestions (settings above, next to the state backend)
+sessions = SessionTable(
+    max_sessions=SESSION_MAX,
+    idle_ttl_seconds=SESSION_IDLE_TTL_MINUTES * 60,
+    context_size=SESSION_CONTEXT_SIZE,
+)
+
+
+def resolve_session_id(request: Request, session_id: str | None) -> str:
+    """
+    Session key for a request: Omi's ?uid=, else the payload's or ?session_id=.
+
+    uid comes first because Omi sends it to every webhook, while the
+    memory-created body carries no session_id; keying on it lets
+    /memory-created clear the same session /webhook has been filling.
+    """
+    return (request.query_params.get("uid")
+            or (str(session_id) if session_id else None)
+            or request.query_params.get("session_id")
+            or DEFAULT_SESSION)
 
 
 class TranscriptSegment(BaseModel):
     """Incoming transcript segment from Omi."""
-    text: str
+    text: Optional[str] = ""
+    id: Optional[str | int] = None
     speaker: Optional[str] = None
-    speaker_id: Optional[int] = None
+    speaker_id: Optional[str | int] = None
     is_user: Optional[bool] = False
+    start: Optional[float] = None
+    end: Optional[float] = None
     timestamp: Optional[float] = None
 
 
 class WebhookPayload(BaseModel):
-    """Full webhook payload from Omi."""
-    session_id: Optional[str] = None
+    """Full webhook payload from Omi (or a plain {"transcript"/"text": ...} test payload)."""
+    session_id: Optional[str | int] = None
     segments: list[TranscriptSegment] = []
+    transcript: Optional[str] = None
+    text: Optional[str] = None
+
+
+def parse_webhook_payload(body: bytes) -> WebhookPayload:
+    """
+    Validate a webhook body in one pass, accepting a bare segment list or string too.
+
+    Raises ValidationError for anything else, including malformed JSON and
+    objects that don't fit the schema (they are never stringified into a transcript).
+    """
+    try:
+        return WebhookPayload.model_validate_json(body)
+    except ValidationError as e:
+        try:
+            data = json.loads(body)
+        except ValueError:
+            # Not JSON at all: pydantic's json_invalid error describes it
+            raise e from None
+        if isinstance(data, list):
+            return WebhookPayload(segments=data)
+        if isinstance(data, str):
+            return WebhookPayload(text=data)
+        raise
 
 
 @app.get("/")
 async def health_check():
     """Health check endpoint."""
-    return {"status": "ok", "app": "Bilingual Conversation Coach"}
+    return {
+        "status": "ok",
+        "app": "Bilingual Conversation Coach",
+        "tts_cache": tts_cache.stats(),
+        "state": state.stats(),
+        "audio_store": audio_store.stats(),
+        "fast_path": fast_path.stats(),
+        "sessions": sessions.stats(),
+        "events": events.stats(),
+        "history_db": history_db.stats() if history_db is not None else None,
+        "translation_cache": translation_cache.stats(),
+        "coach_cache": {"policy": COACH_CACHE_POLICY, **coach_cache.stats()},
+        "admission": admission.stats(),
+        "breakers": {"kokoro": kokoro_breaker.stats(), "openai": openai_breaker.stats()},
+        "phrase_library": phrase_library.stats() if phrase_library is not None else None,
+    }
+
+
+async def coach_transcript(session: Session, transcript: str, deadline: Deadline) -> dict:
+    """
+    Get a coaching suggestion (and phrase audio) for a session's latest transcript.
+
+    Raises Shed if there isn't enough of the deadline left for the LLM call;
+    audio that isn't ready by the deadline is left out (text-only suggestion).
+    """
+    # Add to this session's context (keeps the last SESSION_CONTEXT_SIZE segments)
+    recent_context = (await state.append_context(session, transcript))[-3:]
+
+    # Plain English and small talk never need coaching - skip the LLM round trip
+    if fast_path.should_skip(transcript):
+        webhook_skips.inc("fast_path")
+        return {"message": None}
+
+    # Repeated lines are answered from the cache (skips are cached too, as "")
+    cache_key = coaching_cache_key(transcript, recent_context)
+    suggestion = coach_cache.get(cache_key) if cache_key else None
+
+    if suggestion is None:
+        if deadline.remaining() < WEBHOOK_MIN_LLM_SECONDS:
+            raise Shed("deadline")
+        # Get AI coaching response, starting TTS as soon as the phrase is complete
+        with stage_seconds.time("llm"):
+            suggestion = await stream_coaching(
+                messages=[
+                    {"role": "system", "content": REALTIME_SYSTEM_PROMPT},
+                    {"role": "user", "content": f"Recent context: {' | '.join(recent_context)}\n\nLatest: {transcript}"}
+                ],
+                on_phrase=schedule_phrase_audio,
+                timeout=min(LLM_TIMEOUT_SECONDS, deadline.remaining()),
+            ) or ""
+        if cache_key:
+            coach_cache.put(cache_key, suggestion)
+
+    # Skip if no action needed
+    if not suggestion or SKIP_MARKER in suggestion:
+        webhook_skips.inc("no_action")
+        return {"message": None}
+
+    # Generate TTS for the Portuguese phrase
+    with stage_seconds.time("extract"):
+        portuguese_phrase = extract_portuguese_phrase(suggestion)
+    audio_id = None
+    audio_url = None
+
+    if portuguese_phrase:
+        audio_id = await schedule_phrase_audio(portuguese_phrase)
+        pending = pending_audio.get(audio_id) if audio_id else None
+        if pending is not None and not TTS_BACKGROUND:
+            # Wait for the clip only as long as the deadline allows; it keeps
+            # synthesizing in the background (and is cached) if we give up
+            done, _ = await asyncio.wait({pending}, timeout=deadline.remaining())
+            if pending in done:
+                audio_id = pending.result()
+            else:
+                record_shed("tts_deadline")
+                audio_id = None
+
+        if audio_id:
+            audio_url = f"{BASE_URL}/audio/{audio_id}"
+
+    # Build response message - keep it short, Omi may truncate
+    message = suggestion
+    if audio_url:
+        # Short format to avoid truncation
+        short_id = audio_url.split("/")[-1]
+        message += f"\n🔊 omi.apps.hilo.ca/audio/{short_id}"
+
+    log.info("Suggestion", extra={"session_id": session.session_id, "phrase": portuguese_phrase,
+                                  "audio_id": audio_id, "sample": True})
+    log.debug("Full response", extra={"session_id": session.session_id, "response": message})
+
+    # Store in conversation history and push it to open dashboards
+    record = {
+        "id": str(uuid.uuid4())[:8],
+        "session_id": session.session_id,
+        "timestamp": datetime.now().isoformat(),
+        "original": transcript,
+        "suggestion": suggestion,
+        "portuguese_phrase": portuguese_phrase,
+        "audio_url": audio_url,
+    }
+    with stage_seconds.time("history"):
+        await conversation_history.append(record)
+        if history_db is not None:
+            history_db.enqueue(record)
+        audio_ready = audio_id is not None and await audio_store.contains(audio_id)
+        events.publish("conversation", {**record, "audio_ready": audio_ready})
+
+    webhook_suggestions.inc()
+    return {
+        "message": message,
+        "notify": True
+    }
 
 
 @app.post("/webhook")
@@ -139,110 +870,115 @@ async def handle_transcript(request: Request):
     Omi sends transcript segments as they happen.
     We analyze and return translation + suggested follow-up.
     """
+    deadline = Deadline(WEBHOOK_DEADLINE_SECONDS)
+    with webhook_seconds.time():
+        return await process_transcript(request, deadline)
+
+
+async def process_transcript(request: Request, deadline: Deadline) -> JSONResponse:
     try:
-        data = await request.json()
-        print(f"Received: {data}")
-
-        # Extract transcript text
-        # Omi may send different payload formats - handle flexibly
-        if isinstance(data, dict):
-            # Try common payload structures
-            transcript = data.get("transcript", "")
-            if not transcript:
-                segments = data.get("segments", [])
-                if segments:
-                    # Get the most recent non-user segment
-                    for seg in reversed(segments):
-                        if isinstance(seg, dict) and not seg.get("is_user", False):
-                            transcript = seg.get("text", "")
-                            break
+        with stage_seconds.time("parse"):
+            body = await request.body()
+            if log.isEnabledFor(logging.DEBUG):
+                log.debug("Webhook payload", extra={"payload": body.decode(errors="replace")})
+            payload = parse_webhook_payload(body)
+            session = sessions.get(resolve_session_id(request, payload.session_id))
+
+            # Extract transcript text
+            # Omi may send different payload formats - handle flexibly
+            transcript = payload.transcript or ""
+            if not transcript and payload.segments:
+                # Only segments after this session's cursor are new; coach the other speaker's lines
+                fresh = session.new_segments(payload.segments)
+                transcript = " ".join((seg.text or "").strip() for seg in fresh if not seg.is_user)
+                log.info("Received segments", extra={"session_id": session.session_id, "segments": len(payload.segments),
+                                                     "new": len(fresh), "sample": True})
+            else:
+                log.info("Received transcript", extra={"session_id": session.session_id, "sample": True})
             if not transcript:
-                transcript = data.get("text", "")
-        else:
-            transcript = str(data)
+                transcript = payload.text or ""
 
         if not transcript or len(transcript.strip()) < 3:
+            webhook_skips.inc("too_short")
             return JSONResponse({"message": None})
 
-        # Add to context (keep last 5 exchanges)
-        conversation_context.append(transcript)
-        if len(conversation_context) > 5:
-            conversation_context.pop(0)
-
-        # Get AI coaching response
-        response = client.chat.completions.create(
-            model="gpt-4o-mini",  # Fast and cheap for real-time
-            messages=[
-                {"role": "system", "content": REALTIME_SYSTEM_PROMPT},
-                {"role": "user", "content": f"Recent context: {' | '.join(conversation_context[-3:])}\n\nLatest: {transcript}"}
-            ],
-            max_tokens=150,
-            temperature=0.7
-        )
+        # Omi often resends the same segment - drop repeats outright
+        if session.is_duplicate(transcript, DEDUPE_WINDOW_SECONDS):
+            webhook_skips.inc("duplicate")
+            return JSONResponse({"message": None})
 
-        suggestion = response.choices[0].message.content.strip()
+        # Merge rapid-fire segments; if a newer one arrived, it answers for this one
+        transcript = await session.coalesce(transcript, COALESCE_WINDOW_MS / 1000)
+        if transcript is None:
+            webhook_skips.inc("coalesced")
+            return JSONResponse({"message": None})
 
-        # Skip if no action needed
-        if "No action needed" in suggestion or suggestion == "":
+        # Wait for a work slot (or be shed if the queue is full or time runs out)
+        await admission.acquire(session.session_id, deadline)
+        try:
+            # Run coaching as a task so a newer segment can cancel it
+            task = asyncio.create_task(coach_transcript(session, transcript, deadline))
+            session.track(task)
+            await asyncio.wait({task})
+        finally:
+            admission.release()
+        if task.cancelled():
+            webhook_skips.inc("superseded")
+            return JSONResponse({"message": None})
+        return JSONResponse(task.result())
+
+    except Shed as e:
+        record_shed(e.reason)
+        return JSONResponse({"message": None})
+    except ValidationError as e:
+        webhook_errors.inc("invalid_payload")
+        log.warning("Invalid webhook payload", extra={"errors": e.error_count()})
+        return JSONResponse({"message": None, "error": "Invalid payload"}, status_code=422)
+    except asyncio.TimeoutError:
+        if deadline.expired:
+            # The LLM call was cut short by this webhook's deadline
+            record_shed("deadline")
             return JSONResponse({"message": None})
+        webhook_errors.inc("llm_timeout")
+        log.warning("LLM timed out", extra={"timeout_seconds": LLM_TIMEOUT_SECONDS})
+        return JSONResponse({"message": None, "error": "LLM timeout"})
+    except CircuitOpenError:
+        webhook_errors.inc("llm_unavailable")
+        return JSONResponse({"message": None, "error": "LLM unavailable"})
+    except Exception as e:
+        webhook_errors.inc(type(e).__name__)
+        log.exception("Webhook error")
+        return JSONResponse({"message": None, "error": str(e)})
 
-        print(f"Suggestion: {suggestion}")
 
-        # Generate TTS for the Portuguese phrase
-        portuguese_phrase = extract_portuguese_phrase(suggestion)
-        audio_url = None
-
-        if portuguese_phrase:
-            print(f"Generating audio for: {portuguese_phrase}")
-            audio_data = await generate_tts(portuguese_phrase)
-
-            if audio_data:
-                # Store audio with unique ID
-                audio_id = str(uuid.uuid4())[:8]
-                audio_cache[audio_id] = {
-                    "audio": audio_data,
-                    "phrase": portuguese_phrase,
-                    "created": datetime.now()
-                }
-                audio_url = f"{BASE_URL}/audio/{audio_id}"
-                print(f"Audio stored: {audio_url}")
-
-                # Cleanup old audio periodically
-                cleanup_old_audio()
-
-        # Build response message - keep it short, Omi may truncate
-        message = suggestion
-        if audio_url:
-            # Short format to avoid truncation
-            short_id = audio_url.split("/")[-1]
-            message += f"\n🔊 omi.apps.hilo.ca/audio/{short_id}"
-
-        print(f"=== FULL RESPONSE ===")
-        print(f"{message}")
-        print(f"=====================")
-
-        # Store in conversation history
-        conversation_history.append({
-            "id": str(uuid.uuid4())[:8],
-            "timestamp": datetime.now().isoformat(),
-            "original": transcript,
-            "suggestion": suggestion,
-            "portuguese_phrase": portuguese_phrase,
-            "audio_url": audio_url,
-        })
-
-        # Keep history bounded
-        while len(conversation_history) > MAX_HISTORY:
-            conversation_history.pop(0)
+async def translate_text(text: str) -> str:
+    """Translate one text, answering repeats from the exact-match cache."""
+    cached = translation_cache.get(text)
+    if cached is not None:
+        return cached
+    translation = await chat_completion(
+        messages=[
+            {"role": "system", "content": TRANSLATE_SYSTEM_PROMPT},
+            {"role": "user", "content": text}
+        ],
+        max_tokens=100
+    )
+    translation_cache.put(text, translation)
+    return translation
 
-        return JSONResponse({
-            "message": message,
-            "notify": True
-        })
 
-    except Exception as e:
-        print(f"Error: {e}")
-        return JSONResponse({"message": None, "error": str(e)})
+async def translate_chunk(texts: list[str]) -> list[str | None]:
+    """Translate several texts in one completion; None marks a line the model dropped."""
+    output = await chat_completion(
+        messages=[
+            {"role": "system", "content": BATCH_SYSTEM_PROMPT},
+            {"role": "user", "content": numbered_prompt(texts)}
+        ],
+        max_tokens=min(4000, 2 * sum(estimate_tokens(t) for t in texts) + 50),
+        timeout=TRANSLATE_BATCH_TIMEOUT_SECONDS,
+    )
+    translations = parse_numbered(output, len(texts))
+    return [translations.get(n) for n in range(1, len(texts) + 1)]
 
 
 @app.post("/translate")
@@ -254,16 +990,85 @@ async def translate_only(request: Request):
     if not text:
         raise HTTPException(status_code=400, detail="No text provided")
 
-    response = client.chat.completions.create(
-        model="gpt-4o-mini",
-        messages=[
-            {"role": "system", "content": "Translate between English and Brazilian Portuguese. Be natural, not literal. Just return the translation."},
-            {"role": "user", "content": text}
-        ],
-        max_tokens=100
-    )
+    try:
+        translation = await translate_text(text)
+    except asyncio.TimeoutError:
+        raise HTTPException(status_code=504, detail="Translation timed out")
+    except CircuitOpenError:
+        raise HTTPException(status_code=503, detail="Translation service unavailable",
+                            headers={"Retry-After": str(int(BREAKER_OPEN_SECONDS))})
+
+    return {"translation": translation}
 
-    return {"translation": response.choices[0].message.content.strip()}
+
+@app.post("/translate/batch")
+async def translate_batch(request: Request):
+    """
+    Translate many texts with as few LLM calls as possible.
+
+    POST /translate/batch
+    {"texts": ["Estou com saudade de casa", "How was your day?"]}
+
+    Returns NDJSON, one line per input as soon as it is ready (not in input order):
+    {"index": 0, "text": "...", "translation": "...", "cached": false}
+    Failed items carry "error" instead of "translation".
+    """
+    data = await request.json()
+    texts = data.get("texts") if isinstance(data, dict) else None
+    if not isinstance(texts, list) or not texts or not all(isinstance(t, str) for t in texts):
+        raise HTTPException(status_code=400, detail="Provide a non-empty list of strings as texts")
+    if len(texts) > TRANSLATE_BATCH_MAX_TEXTS:
+        raise HTTPException(status_code=413, detail=f"At most {TRANSLATE_BATCH_MAX_TEXTS} texts per batch")
+
+    async def results():
+        # Cached and blank texts answer immediately; the rest are deduplicated
+        todo: dict[str, list[int]] = {}
+        for index, text in enumerate(texts):
+            cached = translation_cache.get(text) if text.strip() else ""
+            if cached is not None:
+                yield json.dumps({"index": index, "text": text, "translation": cached, "cached": True}) + "\n"
+            else:
+                todo.setdefault(text, []).append(index)
+
+        unique = list(todo)
+        chunk_slots = asyncio.Semaphore(TRANSLATE_BATCH_CONCURRENCY)
+
+        async def run_chunk(indexes: list[int]):
+            chunk = [unique[i] for i in indexes]
+            async with chunk_slots:
+                try:
+                    translated = await translate_chunk(chunk)
+                except Exception as e:
+                    return chunk, [None] * len(chunk), str(e) or type(e).__name__
+                # Retry lines the model dropped one at a time
+                for i, (text, translation) in enumerate(zip(chunk, translated)):
+                    if translation is None:
+                        try:
+                            translated[i] = await translate_text(text)
+                        except Exception:
+                            pass
+                return chunk, translated, "Translation missing from model output"
+
+        tasks = [asyncio.create_task(run_chunk(batch))
+                 for batch in pack_batches(unique, TRANSLATE_BATCH_MAX_TOKENS, TRANSLATE_BATCH_MAX_LINES)]
+        try:
+            for finished in asyncio.as_completed(tasks):
+                chunk, translated, error = await finished
+                for text, translation in zip(chunk, translated):
+                    if translation is not None:
+                        translation_cache.put(text, translation)
+                    for index in todo[text]:
+                        item = {"index": index, "text": text}
+                        if translation is not None:
+                            item.update(translation=translation, cached=False)
+                        else:
+                            item["error"] = error
+                        yield json.dumps(item) + "\n"
+        finally:
+            for task in tasks:
+                task.cancel()
+
+    return StreamingResponse(results(), media_type="application/x-ndjson")
 
 
 @app.post("/memory-created")
@@ -273,10 +1078,13 @@ async def handle_memory_created(request: Request):
     Can be used to send a full conversation summary.
     """
     data = await request.json()
-    print(f"Memory created: {data}")
+    log.debug("Memory payload", extra={"payload": data})
 
-    # Clear conversation context for next conversation
-    conversation_context.clear()
+    # Clear this session's context for its next conversation
+    session_id = resolve_session_id(request, data.get("session_id") if isinstance(data, dict) else None)
+    sessions.discard(session_id)
+    await state.clear_context(session_id)
+    log.info("Memory created", extra={"session_id": session_id})
 
     return JSONResponse({"status": "received"})
 
@@ -287,22 +1095,23 @@ async def text_to_speech(request: Request):
     Generate Brazilian Portuguese audio for a phrase.
 
     POST /tts
-    {"text": "Como você está?", "voice": "bf_isabella"}
+    {"text": "Como você está?", "voice": "bf_isabella", "format": "opus"}
 
-    Returns: MP3 audio
+    Returns: audio in the requested format ("format", ?format= or Accept; AUDIO_FORMAT by default)
     """
     data = await request.json()
     text = data.get("text", "")
     voice = data.get("voice", "pf_dora")  # Default to Brazilian Portuguese female
+    response_format = requested_audio_format(request, data.get("format") or request.query_params.get("format"))
 
     if not text:
         raise HTTPException(status_code=400, detail="No text provided")
 
-    print(f"Generating TTS for: {text}")
-    audio = await generate_tts(text, voice)
+    log.debug("Generating TTS", extra={"text": text, "voice": voice, "format": response_format})
+    _, audio = await synthesize_phrase(text, voice, response_format)
 
     if audio:
-        return Response(content=audio, media_type="audio/mpeg")
+        return Response(content=audio, media_type=AUDIO_MEDIA_TYPES[response_format], headers={"Vary": "Accept"})
     else:
         raise HTTPException(status_code=503, detail="TTS service unavailable")
 
@@ -314,7 +1123,7 @@ async def test_tts():
     audio = await generate_tts(test_phrase)
 
     if audio:
-        return Response(content=audio, media_type="audio/mpeg")
+        return Response(content=audio, media_type=AUDIO_MEDIA_TYPES[AUDIO_FORMAT])
     else:
         return JSONResponse({
             "error": "TTS unavailable",
@@ -324,343 +1133,161 @@ async def test_tts():
 
 
 @app.get("/audio/{audio_id}")
-async def get_audio(audio_id: str):
+async def get_audio(audio_id: str, request: Request, fmt: Optional[str] = Query(None, alias="format")):
     """
     Serve stored audio by ID.
 
-    Example: GET /audio/abc123
-    Returns: MP3 audio file
-    """
-    if audio_id not in audio_cache:
-        raise HTTPException(status_code=404, detail="Audio not found or expired")
+    Example: GET /audio/abc123 (or /audio/abc123?format=opus)
+    Returns: audio file (waits briefly if it is still being generated)
 
-    audio_data = audio_cache[audio_id]
-    return Response(
-        content=audio_data["audio"],
-        media_type="audio/mpeg",
-        headers={
-            "Content-Disposition": f'inline; filename="phrase-{audio_id}.mp3"'
-        }
-    )
+    The format comes from ?format= or the Accept header (AUDIO_FORMAT by
+    default). IDs are content-addressed, so clips are cached as immutable,
+    revalidate with a 304 and support byte ranges for seeking.
+    """
+    response_format = requested_audio_format(request, fmt)
+    etag = f'"{variant_audio_id(audio_id, response_format)}"'
+    headers = {"ETag": etag, "Cache-Control": IMMUTABLE, "Vary": "Accept"}
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers=headers)
+
+    entry, response_format = await audio_variant(audio_id, response_format)
+    media_type = AUDIO_MEDIA_TYPES[response_format]
+
+    headers["ETag"] = f'"{entry.audio_id}"'
+    headers["Content-Disposition"] = f'inline; filename="phrase-{audio_id}.{AUDIO_EXTENSIONS[response_format]}"'
+    if entry.path:
+        if not request.headers.get("range"):
+            # Disk-backed clips are streamed from the file, never loaded into memory
+            return FileResponse(entry.path, media_type=media_type, headers={**headers, "Accept-Ranges": "bytes"})
+        return ranged_response(request, None, entry.size, media_type, headers,
+                               read_range=lambda start, length: read_file_range(entry.path, start, length))
+    return ranged_response(request, entry.audio, entry.size, media_type, headers)
 
 
 @app.get("/audio/{audio_id}/info")
 async def get_audio_info(audio_id: str):
     """Get info about stored audio."""
-    if audio_id not in audio_cache:
-        raise HTTPException(status_code=404, detail="Audio not found or expired")
+    entry = await wait_for_audio(audio_id)
 
-    audio_data = audio_cache[audio_id]
     return {
         "id": audio_id,
-        "phrase": audio_data["phrase"],
-        "created": audio_data["created"].isoformat(),
+        "phrase": entry.phrase,
+        "created": entry.created.isoformat(),
         "url": f"{BASE_URL}/audio/{audio_id}"
     }
 
 
+@app.get("/metrics")
+async def get_metrics():
+    """Prometheus scrape endpoint."""
+    return Response(content=metrics.render(), media_type="text/plain; version=0.0.4")
+
+
 # ============== UI ==============
 
+# The dashboard is a static asset: read and precompressed once at startup
+dashboard_asset = StaticAsset(
+    os.path.join(os.path.dirname(os.path.abspath(__file__)), "static", "dashboard.html"),
+    media_type="text/html",
+)
+
+
+# Largest page /api/conversations hands out in one response
+CONVERSATIONS_MAX_LIMIT = 1000
+
+
 @app.get("/api/conversations")
-async def get_conversations():
-    """Get conversation history."""
-    return {"conversations": list(reversed(conversation_history))}
+async def get_conversations(request: Request,
+                            since: Optional[int] = Query(None, ge=0),
+                            limit: Optional[int] = Query(None, ge=1, le=CONVERSATIONS_MAX_LIMIT)):
+    """
+    Get conversation history, newest first.
 
+    GET /api/conversations?since=42&limit=50 returns only entries after seq 42.
+    Responses carry an ETag; an unchanged history answers 304 Not Modified.
+    """
+    await conversation_history.refresh()
+    etag = conversation_history.etag
+    if etag_matches(request, etag):
+        return Response(status_code=304, headers={"ETag": etag})
+
+    page = await conversation_history.page(since=since, limit=limit)
+    # Cursor for the next delta poll: the newest seq this client has now seen
+    if page:
+        next_since = page[0]["seq"]
+    else:
+        next_since = since if since is not None else conversation_history.last_seq
+    return JSONResponse({
+        "conversations": page,
+        "last_seq": conversation_history.last_seq,
+        "next_since": next_since,
+        "total": len(conversation_history),
+        "audio_total": conversation_history.audio_count,
+        # Live events only cover this worker; dashboards poll since= to see the others
+        "shared_state": STATE_BACKEND == "sqlite",
+    }, headers={"ETag": etag})
 
-@app.get("/ui", response_class=HTMLResponse)
-async def dashboard():
-    """Simple dashboard UI showing conversations and audio."""
-    html = """
-<!DOCTYPE html>
-<html lang="en">
-<head>
-    <meta charset="UTF-8">
-    <meta name="viewport" content="width=device-width, initial-scale=1.0">
-    <title>Bilingual Coach - Dashboard</title>
-    <style>
-        * { box-sizing: border-box; margin: 0; padding: 0; }
-        body {
-            font-family: -apple-system, BlinkMacSystemFont, 'Segoe UI', Roboto, sans-serif;
-            background: linear-gradient(135deg, #1a1a2e 0%, #16213e 100%);
-            min-height: 100vh;
-            color: #fff;
-            padding: 20px;
-        }
-        .container { max-width: 800px; margin: 0 auto; }
-        h1 {
-            text-align: center;
-            margin-bottom: 10px;
-            font-size: 2em;
-        }
-        .subtitle {
-            text-align: center;
-            color: #888;
-            margin-bottom: 30px;
-        }
-        .stats {
-            display: flex;
-            gap: 20px;
-            justify-content: center;
-            margin-bottom: 30px;
-        }
-        .stat {
-            background: rgba(255,255,255,0.1);
-            padding: 15px 25px;
-            border-radius: 10px;
-            text-align: center;
-        }
-        .stat-value { font-size: 2em; font-weight: bold; color: #4ade80; }
-        .stat-label { color: #888; font-size: 0.9em; }
-        .conversation {
-            background: rgba(255,255,255,0.05);
-            border-radius: 12px;
-            padding: 20px;
-            margin-bottom: 15px;
-            border-left: 4px solid #4ade80;
-        }
-        .conversation:hover { background: rgba(255,255,255,0.08); }
-        .time {
-            color: #666;
-            font-size: 0.8em;
-            margin-bottom: 10px;
-        }
-        .original {
-            color: #fbbf24;
-            font-size: 1.1em;
-            margin-bottom: 10px;
-        }
-        .original::before { content: '🇧🇷 '; }
-        .translation {
-            color: #94a3b8;
-            margin-bottom: 10px;
-            padding-left: 20px;
-            border-left: 2px solid #333;
-        }
-        .suggestion {
-            background: rgba(74, 222, 128, 0.1);
-            padding: 12px;
-            border-radius: 8px;
-            margin-bottom: 10px;
-        }
-        .portuguese-phrase {
-            color: #4ade80;
-            font-size: 1.1em;
-            font-weight: 500;
-        }
-        .audio-player {
-            margin-top: 10px;
-        }
-        audio {
-            width: 100%;
-            height: 40px;
-            border-radius: 20px;
-        }
-        .no-audio {
-            color: #666;
-            font-style: italic;
-            font-size: 0.9em;
-        }
-        .empty {
-            text-align: center;
-            padding: 60px;
-            color: #666;
-        }
-        .refresh-btn {
-            display: block;
-            margin: 0 auto 30px;
-            padding: 10px 30px;
-            background: #4ade80;
-            color: #000;
-            border: none;
-            border-radius: 20px;
-            cursor: pointer;
-            font-weight: bold;
-        }
-        .refresh-btn:hover { background: #22c55e; }
-        .live-indicator {
-            display: inline-block;
-            width: 10px;
-            height: 10px;
-            background: #4ade80;
-            border-radius: 50%;
-            margin-right: 8px;
-            animation: pulse 2s infinite;
-        }
-        @keyframes pulse {
-            0%, 100% { opacity: 1; }
-            50% { opacity: 0.5; }
-        }
-        .controls {
-            display: flex;
-            justify-content: center;
-            gap: 15px;
-            margin-bottom: 20px;
-            flex-wrap: wrap;
-        }
-        .toggle-btn {
-            padding: 10px 20px;
-            background: rgba(255,255,255,0.1);
-            color: #fff;
-            border: 2px solid #4ade80;
-            border-radius: 20px;
-            cursor: pointer;
-            font-weight: bold;
-            transition: all 0.3s;
-        }
-        .toggle-btn.active {
-            background: #4ade80;
-            color: #000;
-        }
-        .toggle-btn:hover { opacity: 0.8; }
-        .new-audio {
-            animation: glow 1s ease-in-out;
-        }
-        @keyframes glow {
-            0%, 100% { box-shadow: 0 0 0 rgba(74, 222, 128, 0); }
-            50% { box-shadow: 0 0 30px rgba(74, 222, 128, 0.8); }
-        }
-        .now-playing {
-            background: rgba(74, 222, 128, 0.2);
-            border-left-color: #fbbf24;
-        }
-    </style>
-</head>
-<body>
-    <div class="container">
-        <h1>🗣️ Bilingual Coach</h1>
-        <p class="subtitle">English ↔ Brazilian Portuguese</p>
-
-        <div class="stats">
-            <div class="stat">
-                <div class="stat-value" id="total-count">-</div>
-                <div class="stat-label">Conversations</div>
-            </div>
-            <div class="stat">
-                <div class="stat-value" id="audio-count">-</div>
-                <div class="stat-label">Audio Generated</div>
-            </div>
-        </div>
-
-        <div class="controls">
-            <button class="toggle-btn active" id="autoplay-btn" onclick="toggleAutoplay()">
-                🔊 Auto-Play ON
-            </button>
-            <button class="refresh-btn" onclick="loadConversations()">
-                <span class="live-indicator"></span> Refresh
-            </button>
-        </div>
-
-        <div id="conversations"></div>
-    </div>
-
-    <script>
-        let autoplayEnabled = true;
-        let lastSeenId = null;
-        let currentAudio = null;
-
-        function toggleAutoplay() {
-            autoplayEnabled = !autoplayEnabled;
-            const btn = document.getElementById('autoplay-btn');
-            btn.textContent = autoplayEnabled ? '🔊 Auto-Play ON' : '🔇 Auto-Play OFF';
-            btn.classList.toggle('active', autoplayEnabled);
-        }
-
-        async function loadConversations() {
-            try {
-                const res = await fetch('/api/conversations');
-                const data = await res.json();
-
-                document.getElementById('total-count').textContent = data.conversations.length;
-                document.getElementById('audio-count').textContent =
-                    data.conversations.filter(c => c.audio_url).length;
-
-                const container = document.getElementById('conversations');
-
-                if (data.conversations.length === 0) {
-                    container.innerHTML = '<div class="empty">No conversations yet.<br>Start speaking Portuguese with Omi!</div>';
-                    return;
-                }
 
-                // Check for new conversation with audio
-                const newest = data.conversations[0];
-                if (newest && newest.id !== lastSeenId && newest.audio_url && autoplayEnabled) {
-                    // New conversation with audio - will auto-play after render
-                    setTimeout(() => playNewestAudio(newest.id), 100);
-                }
-                lastSeenId = newest?.id;
-
-                container.innerHTML = data.conversations.map((conv, idx) => `
-                    <div class="conversation" id="conv-${conv.id}" ${idx === 0 ? 'data-newest="true"' : ''}>
-                        <div class="time">${new Date(conv.timestamp).toLocaleString()}</div>
-                        <div class="original">${escapeHtml(conv.original)}</div>
-                        <div class="suggestion">${formatSuggestion(conv.suggestion)}</div>
-                        ${conv.portuguese_phrase ? `
-                            <div class="portuguese-phrase">💬 "${escapeHtml(conv.portuguese_phrase)}"</div>
-                        ` : ''}
-                        ${conv.audio_url ? `
-                            <div class="audio-player">
-                                <audio id="audio-${conv.id}" controls src="${conv.audio_url}"
-                                    onplay="onAudioPlay('${conv.id}')" onended="onAudioEnd('${conv.id}')"></audio>
-                            </div>
-                        ` : '<div class="no-audio">No audio generated</div>'}
-                    </div>
-                `).join('');
-            } catch (err) {
-                console.error('Failed to load:', err);
-            }
-        }
-
-        function playNewestAudio(id) {
-            const audio = document.getElementById('audio-' + id);
-            if (audio) {
-                // Stop any currently playing audio
-                if (currentAudio && currentAudio !== audio) {
-                    currentAudio.pause();
-                }
-                audio.play().catch(e => console.log('Autoplay blocked:', e));
-                currentAudio = audio;
+def require_history_db() -> HistoryDatabase:
+    if history_db is None:
+        raise HTTPException(status_code=404, detail="History persistence is disabled (set HISTORY_DB_PATH)")
+    return history_db
 
-                // Highlight the conversation
-                const conv = document.getElementById('conv-' + id);
-                if (conv) {
-                    conv.classList.add('new-audio');
-                }
-            }
-        }
 
-        function onAudioPlay(id) {
-            const conv = document.getElementById('conv-' + id);
-            if (conv) conv.classList.add('now-playing');
-        }
+HISTORY_MAX_LIMIT = 500
 
-        function onAudioEnd(id) {
-            const conv = document.getElementById('conv-' + id);
-            if (conv) conv.classList.remove('now-playing');
-        }
 
-        function escapeHtml(text) {
-            const div = document.createElement('div');
-            div.textContent = text;
-            return div.innerHTML;
-        }
+@app.get("/api/history/search")
+async def search_history(q: Optional[str] = None, session_id: Optional[str] = None,
+                         since: Optional[str] = None, until: Optional[str] = None,
+                         limit: int = Query(50, ge=1, le=HISTORY_MAX_LIMIT)):
+    """
+    Search persisted conversations by text, session and time range.
+
+    GET /api/history/search?q=saudade&session_id=abc&since=2024-06-01T00:00:00
+    since/until accept ISO-8601 datetimes or epoch seconds.
+    """
+    db = require_history_db()
+    try:
+        results = await db.search(q, session_id, parse_time(since), parse_time(until), limit)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="since/until must be ISO-8601 or epoch seconds")
+    return {"results": results}
+
+
+@app.get("/api/history/phrases")
+async def history_phrases(q: Optional[str] = None, session_id: Optional[str] = None,
+                          since: Optional[str] = None, until: Optional[str] = None,
+                          limit: int = Query(50, ge=1, le=HISTORY_MAX_LIMIT)):
+    """Most frequently suggested Portuguese phrases (same filters as /api/history/search)."""
+    db = require_history_db()
+    try:
+        phrases = await db.top_phrases(q, session_id, parse_time(since), parse_time(until), limit)
+    except ValueError:
+        raise HTTPException(status_code=400, detail="since/until must be ISO-8601 or epoch seconds")
+    return {"phrases": phrases}
 
-        function formatSuggestion(text) {
-            return escapeHtml(text)
-                .replace(/🔄/g, '<br>🔄')
-                .replace(/💬/g, '<br>💬')
-                .replace(/🇧🇷/g, '<br>🇧🇷');
-        }
 
-        // Load on start
-        loadConversations();
+@app.get("/api/events")
+async def conversation_events(request: Request):
+    """
+    Live feed of new conversations and audio-ready events (Server-Sent Events).
 
-        // Auto-refresh every 3 seconds for real-time feel
-        setInterval(loadConversations, 3000);
-    </script>
-</body>
-</html>
+    Reconnecting clients send Last-Event-ID (or ?last_event_id=) to resume.
     """
-    return HTMLResponse(content=html)
+    last_event_id = request.headers.get("last-event-id") or request.query_params.get("last_event_id")
+    sub = events.subscribe(int(last_event_id) if last_event_id and last_event_id.isdigit() else None)
+    return StreamingResponse(
+        events.stream(sub, EVENTS_HEARTBEAT_SECONDS),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.get("/ui", response_class=HTMLResponse)
+async def dashboard(request: Request):
+    """Simple dashboard UI showing conversations and audio (static/dashboard.html)."""
+    return dashboard_asset.response(request)
 
 
 if __name__ == "__main__":
@@ -675,4 +1302,11 @@ if __name__ == "__main__":
     print("🔗 Use ngrok to expose: ngrok http 8000\n")
 
     port = int(os.getenv("PORT", 3000))
-    uvicorn.run(app, host="0.0.0.0", port=port)
+    workers = int(os.getenv("WORKERS", "1"))
+    if workers > 1:
+        if STATE_BACKEND == "memory":
+            print("Warning: WORKERS > 1 with STATE_BACKEND=memory - audio links and history won't be shared")
+        # Workers import the app themselves, so pass it by name
+        uvicorn.run("server:app", host="0.0.0.0", port=port, workers=workers)
+    else:
+        uvicorn.run(app, host="0.0.0.0", port=port)
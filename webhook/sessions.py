@@ -0,0 +1,230 @@
+"""
+Per-session state for concurrent Omi wearers.
+
+Each session keeps its own fixed-size context buffer, so simultaneous
+conversations never see each other's transcripts. Sessions live in an LRU
+table ordered by last activity: idle sessions expire after a TTL and the least
+recently active ones are evicted once the table is full, keeping memory
+predictable however many devices connect.
+
+Sessions also coalesce rapid-fire webhook calls: segments arriving within a
+short window are merged into one coaching request, coaching work that a newer
+segment supersedes is cancelled, and repeats of a recent segment are dropped.
+A per-session cursor remembers the last segment seen, so only new segments of
+an ever-growing Omi payload are examined.
+"""
+
+import asyncio
+import hashlib
+import time
+from collections import OrderedDict, deque
+
+DEFAULT_SESSION = "default"
+MAX_RECENT_SEGMENTS = 64  # per-session memory for duplicate detection
+
+
+class Session:
+    """State kept for one Omi session."""
+
+    def __init__(self, session_id: str, context_size: int, counters: dict):
+        self.session_id = session_id
+        self.context: deque[str] = deque(maxlen=context_size)
+        self.last_seen = time.monotonic()
+        self.generation = 0
+        self.pending: list[str] = []
+        self.inflight: asyncio.Task | None = None
+        self._recent: OrderedDict[str, float] = OrderedDict()
+        self._counters = counters
+        self.cursor_position: float | None = None
+        self.cursor_id: str | None = None
+        # End and text length of the cursor segment, so a resent segment that grew counts as new
+        self.cursor_end: float | None = None
+        self.cursor_length = 0
+
+    def new_segments(self, segments: list) -> list:
+        """
+        Return the segments after this session's cursor and advance it.
+
+        Segments are matched by start time (or timestamp) and ID, scanning back
+        from the end of the payload, so the cost depends on how many segments
+        are new rather than on the payload size. Omi resends the segment it is
+        still transcribing with a later end and longer text, so the cursor
+        segment counts as new again once either has grown. With nothing to
+        resume from (a new or expired session, a restarted timeline, or
+        segments without IDs or positions) only the trailing non-user segment
+        counts as new and the cursor moves to the end of the payload.
+        """
+        if not segments:
+            return []
+
+        last = segments[-1]
+        last_position = _segment_position(last)
+        if (self.cursor_position is not None and last_position is not None
+                and last_position < self.cursor_position):
+            self.cursor_position = None
+            self.cursor_id = None
+
+        if (self.cursor_position is None and self.cursor_id is None) or (last_position is None and last.id is None):
+            self._move_cursor(last)
+            for seg in reversed(segments):
+                if not seg.is_user:
+                    return [seg]
+            return []
+
+        fresh = []
+        for seg in reversed(segments):
+            position = _segment_position(seg)
+            if self.cursor_id is not None and seg.id is not None and str(seg.id) == self.cursor_id:
+                if self._grew(seg):
+                    fresh.append(seg)
+                break
+            if (self.cursor_position is not None and position is not None
+                    and position <= self.cursor_position):
+                if position == self.cursor_position and self._grew(seg):
+                    fresh.append(seg)
+                break
+            fresh.append(seg)
+        fresh.reverse()
+
+        if fresh:
+            self._move_cursor(last)
+        return fresh
+
+    def _move_cursor(self, seg):
+        self.cursor_position = _segment_position(seg)
+        self.cursor_id = str(seg.id) if seg.id is not None else None
+        self.cursor_end = seg.end
+        self.cursor_length = len(seg.text or "")
+
+    def _grew(self, seg) -> bool:
+        """True if seg is the cursor segment resent with a later end or longer text."""
+        if seg.end is not None and (self.cursor_end is None or seg.end > self.cursor_end):
+            return True
+        return len(seg.text or "") > self.cursor_length
+
+    def is_duplicate(self, text: str, window_seconds: float) -> bool:
+        """True if the same segment was already seen within the window (and records it)."""
+        now = time.monotonic()
+        while self._recent and now - next(iter(self._recent.values())) >= window_seconds:
+            self._recent.popitem(last=False)
+
+        digest = hashlib.sha1(" ".join(text.lower().split()).encode("utf-8")).hexdigest()
+        if digest in self._recent:
+            self._counters["duplicates"] += 1
+            return True
+        self._recent[digest] = now
+        if len(self._recent) > MAX_RECENT_SEGMENTS:
+            self._recent.popitem(last=False)
+        return False
+
+    async def coalesce(self, text: str, window_seconds: float) -> str | None:
+        """
+        Queue a segment and wait out the debounce window.
+
+        Returns the merged text of every segment queued during the window, or
+        None if a newer segment arrived (that call will carry this text).
+        Coaching work still running for an older segment is cancelled.
+        """
+        self.generation += 1
+        generation = self.generation
+        self.pending.append(text)
+        if self.inflight is not None and not self.inflight.done():
+            self.inflight.cancel()
+            self._counters["superseded"] += 1
+
+        if window_seconds > 0:
+            await asyncio.sleep(window_seconds)
+            if self.generation != generation:
+                self._counters["coalesced"] += 1
+                return None
+
+        merged = merge_segments(self.pending)
+        self.pending = []
+        return merged
+
+    def track(self, task: asyncio.Task):
+        """Remember the coaching task so a newer segment can cancel it."""
+        self.inflight = task
+
+
+class SessionTable:
+    """Bounded table of sessions with idle-TTL and LRU eviction."""
+
+    def __init__(self, max_sessions: int, idle_ttl_seconds: float, context_size: int):
+        self.max_sessions = max_sessions
+        self.idle_ttl_seconds = idle_ttl_seconds
+        self.context_size = context_size
+        self.created = 0
+        self.expired = 0
+        self.evicted = 0
+        self.counters = {"duplicates": 0, "coalesced": 0, "superseded": 0}
+        self._sessions: OrderedDict[str, Session] = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._sessions)
+
+    def get(self, session_id: str) -> Session:
+        """Return the session (creating it if needed) and mark it active."""
+        now = time.monotonic()
+        self._expire_idle(now)
+
+        session = self._sessions.get(session_id)
+        if session is None:
+            session = Session(session_id, self.context_size, self.counters)
+            self._sessions[session_id] = session
+            self.created += 1
+            while len(self._sessions) > self.max_sessions:
+                self._sessions.popitem(last=False)
+                self.evicted += 1
+        else:
+            self._sessions.move_to_end(session_id)
+        session.last_seen = now
+        return session
+
+    def discard(self, session_id: str) -> bool:
+        """Forget a session. Returns True if it existed."""
+        return self._sessions.pop(session_id, None) is not None
+
+    def stats(self) -> dict:
+        return {
+            "active": len(self._sessions),
+            "max_sessions": self.max_sessions,
+            "created": self.created,
+            "expired": self.expired,
+            "evicted": self.evicted,
+            **self.counters,
+        }
+
+    def _expire_idle(self, now: float):
+        # Least recently active sessions sit at the front, so stop at the first live one
+        while self._sessions:
+            session = next(iter(self._sessions.values()))
+            if now - session.last_seen < self.idle_ttl_seconds:
+                break
+            self._sessions.popitem(last=False)
+            self.expired += 1
+
+
+def _segment_position(seg) -> float | None:
+    """Position of a segment on the conversation timeline, if Omi sent one."""
+    return seg.start if seg.start is not None else seg.timestamp
+
+
+def merge_segments(segments: list[str]) -> str:
+    """
+    Merge segments queued in one window into a single transcript.
+
+    Omi often resends a growing version of the same utterance, so a segment
+    that extends the previous one replaces it and one already contained in it
+    is dropped; anything else is appended.
+    """
+    merged: list[str] = []
+    for text in segments:
+        text = text.strip()
+        if merged and text.startswith(merged[-1]):
+            merged[-1] = text
+        elif merged and text in merged[-1]:
+            continue
+        else:
+            merged.append(text)
+    return " ".join(merged)
@@ -0,0 +1,414 @@
+"""
+Pluggable state backends: where audio clips, conversation history and
+session context live.
+
+StateBackend keeps everything in the process (the default, and the fastest
+for a single worker). SQLiteState keeps it in one SQLite database that every
+worker opens, so `uvicorn --workers N` or several containers sharing a volume
+can serve each other's /audio links, history and session context. Caches,
+in-flight work and the live event feed stay per process.
+
+Backend methods are async: SQLite work runs on dedicated threads (one for
+writes, one for reads, each with its own connection), so a write waiting on
+another worker's lock never stalls the event loop. Counts reported by
+stats() and the metrics gauges are refreshed on writes and sweeps rather
+than queried on every scrape.
+"""
+
+import asyncio
+import json
+import sqlite3
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+from audio_store import AudioEntry, AudioStore
+from history import ConversationHistory
+
+
+class StateBackend:
+    """In-process state: the given audio store and history, context kept on each Session."""
+
+    name = "memory"
+
+    def __init__(self, audio: AudioStore, history: ConversationHistory):
+        self.audio = audio
+        self.history = history
+
+    async def append_context(self, session, text: str) -> list[str]:
+        """Add a transcript to a session's context and return the context, oldest first."""
+        session.context.append(text)
+        return list(session.context)
+
+    async def clear_context(self, session_id: str):
+        """Forget a session's context (the session table drops in-process context itself)."""
+
+    async def sweep(self) -> int:
+        """Drop expired state. Returns the number of audio clips removed."""
+        return await self.audio.sweep()
+
+    async def run_sweeper(self, interval_seconds: float):
+        """Background task: sweep expired state even when nothing new arrives."""
+        while True:
+            await asyncio.sleep(interval_seconds)
+            await self.sweep()
+
+    def close(self):
+        pass
+
+    def stats(self) -> dict:
+        return {"backend": self.name}
+
+
+# ============== Shared SQLite backend ==============
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (
+    key TEXT PRIMARY KEY,
+    value TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS audio (
+    audio_id TEXT PRIMARY KEY,
+    phrase TEXT,
+    created TEXT NOT NULL,
+    expires_at REAL NOT NULL,
+    size INTEGER NOT NULL,
+    audio BLOB
+);
+CREATE INDEX IF NOT EXISTS audio_expires ON audio (expires_at);
+CREATE TABLE IF NOT EXISTS history (
+    seq INTEGER PRIMARY KEY AUTOINCREMENT,
+    record TEXT NOT NULL,
+    has_audio INTEGER NOT NULL
+);
+CREATE TABLE IF NOT EXISTS session_context (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    session_id TEXT NOT NULL,
+    ts REAL NOT NULL,
+    text TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS session_context_sid ON session_context (session_id, id);
+"""
+
+
+def connect(path: str) -> sqlite3.Connection:
+    conn = sqlite3.connect(path, check_same_thread=False, timeout=5)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=NORMAL")
+    conn.execute("PRAGMA busy_timeout=5000")
+    conn.executescript(SCHEMA)
+    return conn
+
+
+class Database:
+    """
+    One SQLite database used off the event loop.
+
+    Writes run one at a time on a dedicated thread and connection, each in its
+    own transaction; reads run on a second thread and connection, so (in WAL
+    mode) they are never queued behind a write waiting for the lock.
+    """
+
+    def __init__(self, path: str):
+        self._writer = connect(path)
+        self._reader = connect(path)
+        self._write_thread = ThreadPoolExecutor(max_workers=1, thread_name_prefix="state-write")
+        self._read_thread = ThreadPoolExecutor(max_workers=1, thread_name_prefix="state-read")
+
+    def setup(self, fn):
+        """Run fn(conn) in a write transaction right away (construction time, before serving)."""
+        with self._writer:
+            return fn(self._writer)
+
+    async def write(self, fn):
+        """Run fn(conn) in a write transaction on the writer thread."""
+        def _write():
+            with self._writer:
+                return fn(self._writer)
+        return await asyncio.get_running_loop().run_in_executor(self._write_thread, _write)
+
+    async def read(self, fn):
+        """Run fn(conn) on the reader thread."""
+        return await asyncio.get_running_loop().run_in_executor(self._read_thread, fn, self._reader)
+
+    def close(self):
+        """Finish queued work and close both connections."""
+        self._write_thread.shutdown(wait=True)
+        self._read_thread.shutdown(wait=True)
+        self._writer.close()
+        self._reader.close()
+
+
+class SQLiteAudioStore:
+    """
+    Audio clips as BLOBs in the shared database (same interface as AudioStore).
+
+    A clip being synthesized is recorded as a reservation (a row without
+    audio), so a worker asked for a link another worker just minted knows to
+    wait for it rather than answer 404.
+    """
+
+    backend = "sqlite"
+
+    def __init__(self, db: Database, ttl_seconds: float, max_entries: int, max_bytes: int):
+        self._db = db
+        self.ttl_seconds = ttl_seconds
+        self.max_entries = max_entries
+        self.max_bytes = max_bytes
+        self.stored = 0
+        self.expired = 0
+        self.evicted = 0
+        # Totals across every worker, as of this worker's last write or sweep
+        self.entries, self.total_bytes = db.setup(_audio_totals)
+
+    def __len__(self) -> int:
+        return self.entries
+
+    async def contains(self, audio_id: str) -> bool:
+        return await self._db.read(lambda conn: conn.execute(
+            "SELECT 1 FROM audio WHERE audio_id = ? AND audio IS NOT NULL AND expires_at > ?",
+            (audio_id, time.time()),
+        ).fetchone() is not None)
+
+    async def put(self, audio_id: str, audio: bytes, phrase: str, response_format: str = "mp3") -> AudioEntry | None:
+        """Store (or refresh) a clip and enforce expiry and capacity limits (the format is kept on the entry only)."""
+        if len(audio) > self.max_bytes:
+            return None
+        created = datetime.now()
+        expires_at = time.time() + self.ttl_seconds
+
+        def _put(conn):
+            conn.execute(
+                "INSERT INTO audio (audio_id, phrase, created, expires_at, size, audio) VALUES (?, ?, ?, ?, ?, ?) "
+                "ON CONFLICT (audio_id) DO UPDATE SET phrase = excluded.phrase, expires_at = excluded.expires_at, "
+                "size = excluded.size, audio = excluded.audio, "
+                "created = CASE WHEN audio.audio IS NULL THEN excluded.created ELSE audio.created END",
+                (audio_id, phrase, created.isoformat(), expires_at, len(audio), audio),
+            )
+            return self._enforce_limits(conn), _audio_totals(conn)
+
+        evicted, (self.entries, self.total_bytes) = await self._db.write(_put)
+        self.stored += 1
+        self.evicted += evicted
+        return AudioEntry(audio_id, phrase, created, expires_at, len(audio), audio=audio, response_format=response_format)
+
+    async def get(self, audio_id: str) -> AudioEntry | None:
+        row = await self._db.read(lambda conn: conn.execute(
+            "SELECT phrase, created, expires_at, size, audio FROM audio "
+            "WHERE audio_id = ? AND audio IS NOT NULL AND expires_at > ?",
+            (audio_id, time.time()),
+        ).fetchone())
+        if row is None:
+            return None
+        phrase, created, expires_at, size, audio = row
+        return AudioEntry(audio_id, phrase, datetime.fromisoformat(created), expires_at, size, audio=audio)
+
+    async def reserve(self, audio_id: str, phrase: str, seconds: float):
+        """Record that this clip is being synthesized, for up to seconds."""
+        await self._db.write(lambda conn: conn.execute(
+            "INSERT OR IGNORE INTO audio (audio_id, phrase, created, expires_at, size, audio) "
+            "VALUES (?, ?, ?, ?, 0, NULL)",
+            (audio_id, phrase, datetime.now().isoformat(), time.time() + seconds),
+        ))
+
+    async def unreserve(self, audio_id: str):
+        """Drop a reservation whose synthesis failed."""
+        await self._db.write(lambda conn: conn.execute(
+            "DELETE FROM audio WHERE audio_id = ? AND audio IS NULL", (audio_id,)))
+
+    async def pending(self, audio_id: str) -> bool:
+        """Whether some worker is still synthesizing this clip."""
+        return await self._db.read(lambda conn: conn.execute(
+            "SELECT 1 FROM audio WHERE audio_id = ? AND audio IS NULL AND expires_at > ?",
+            (audio_id, time.time()),
+        ).fetchone() is not None)
+
+    async def sweep(self) -> int:
+        """Drop expired clips and stale reservations. Returns the number of clips removed."""
+        def _sweep(conn):
+            now = time.time()
+            removed = conn.execute("DELETE FROM audio WHERE expires_at <= ? AND audio IS NOT NULL", (now,)).rowcount
+            conn.execute("DELETE FROM audio WHERE expires_at <= ? AND audio IS NULL", (now,))
+            return removed, _audio_totals(conn)
+
+        removed, (self.entries, self.total_bytes) = await self._db.write(_sweep)
+        self.expired += removed
+        return removed
+
+    def _enforce_limits(self, conn: sqlite3.Connection) -> int:
+        """Evict the clips closest to expiry until within the caps. Returns the number evicted."""
+        count, total = _audio_totals(conn)
+        if count <= self.max_entries and total <= self.max_bytes:
+            return 0
+        doomed = []
+        for audio_id, size in conn.execute(
+            "SELECT audio_id, size FROM audio WHERE audio IS NOT NULL ORDER BY expires_at"
+        ):
+            if count <= self.max_entries and total <= self.max_bytes:
+                break
+            doomed.append((audio_id,))
+            count -= 1
+            total -= size
+        conn.executemany("DELETE FROM audio WHERE audio_id = ?", doomed)
+        return len(doomed)
+
+    def stats(self) -> dict:
+        return {
+            "backend": self.backend,
+            "entries": self.entries,
+            "bytes": self.total_bytes,
+            "max_entries": self.max_entries,
+            "max_bytes": self.max_bytes,
+            "stored": self.stored,
+            "expired": self.expired,
+            "evicted": self.evicted,
+        }
+
+
+def _audio_totals(conn: sqlite3.Connection) -> tuple[int, int]:
+    return tuple(conn.execute(
+        "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM audio WHERE audio IS NOT NULL"
+    ).fetchone())
+
+
+class SQLiteHistory:
+    """
+    Conversation history in the shared database (same interface as ConversationHistory).
+
+    AUTOINCREMENT keeps sequence numbers increasing across every worker, so
+    cursor paging and ETags work whichever worker answers. last_seq and the
+    counts are as of this worker's last append or refresh().
+    """
+
+    def __init__(self, db: Database, max_entries: int):
+        self._db = db
+        self.max_entries = max_entries
+
+        def _setup(conn):
+            conn.execute("INSERT OR IGNORE INTO meta (key, value) VALUES ('epoch', ?)", (uuid.uuid4().hex[:8],))
+            return conn.execute("SELECT value FROM meta WHERE key = 'epoch'").fetchone()[0], _history_totals(conn)
+
+        self.epoch, (self.last_seq, self.count, self.audio_count) = db.setup(_setup)
+
+    def __len__(self) -> int:
+        return self.count
+
+    @property
+    def etag(self) -> str:
+        return f'"{self.epoch}-{self.last_seq}"'
+
+    async def append(self, record: dict) -> dict:
+        """Add a record, assigning it the next sequence number."""
+        def _append(conn):
+            seq = conn.execute(
+                "INSERT INTO history (record, has_audio) VALUES (?, ?)",
+                (json.dumps(record, ensure_ascii=False), int(bool(record.get("audio_url")))),
+            ).lastrowid
+            conn.execute("DELETE FROM history WHERE seq <= ?", (seq - self.max_entries,))
+            return seq, _history_totals(conn)
+
+        seq, (self.last_seq, self.count, self.audio_count) = await self._db.write(_append)
+        record["seq"] = seq
+        return record
+
+    async def refresh(self):
+        """Reload last_seq and the counts, which other workers may have moved on."""
+        self.last_seq, self.count, self.audio_count = await self._db.read(_history_totals)
+
+    async def page(self, since: int | None = None, limit: int | None = None) -> list[dict]:
+        """Entries newest first, with the same since/limit semantics as ConversationHistory.page."""
+        def _page(conn):
+            if since is not None:
+                # Oldest entries after since first, so a client can keep paging forward
+                rows = conn.execute(
+                    "SELECT seq, record FROM history WHERE seq > ? ORDER BY seq LIMIT ?",
+                    (since, -1 if limit is None else limit),
+                ).fetchall()
+                rows.reverse()
+                return rows
+            return conn.execute(
+                "SELECT seq, record FROM history ORDER BY seq DESC LIMIT ?",
+                (-1 if limit is None else limit,),
+            ).fetchall()
+
+        return [{**json.loads(record), "seq": seq} for seq, record in await self._db.read(_page)]
+
+
+def _history_totals(conn: sqlite3.Connection) -> tuple[int, int, int]:
+    row = conn.execute("SELECT seq FROM sqlite_sequence WHERE name = 'history'").fetchone()
+    count, audio_count = conn.execute("SELECT COUNT(*), COALESCE(SUM(has_audio), 0) FROM history").fetchone()
+    return (row[0] if row else 0), count, audio_count
+
+
+class SQLiteState(StateBackend):
+    """Audio, history and session context in one SQLite database shared by every worker."""
+
+    name = "sqlite"
+
+    def __init__(self, path: str, ttl_seconds: float, max_entries: int, max_bytes: int,
+                 max_history: int, context_ttl_seconds: float):
+        self.path = path
+        self.context_ttl_seconds = context_ttl_seconds
+        self._db = Database(path)
+        self.sessions_with_context = self._db.setup(_sessions_with_context)
+        super().__init__(
+            SQLiteAudioStore(self._db, ttl_seconds, max_entries, max_bytes),
+            SQLiteHistory(self._db, max_history),
+        )
+
+    async def append_context(self, session, text: str) -> list[str]:
+        keep = session.context.maxlen
+
+        def _append(conn):
+            conn.execute(
+                "INSERT INTO session_context (session_id, ts, text) VALUES (?, ?, ?)",
+                (session.session_id, time.time(), text),
+            )
+            conn.execute(
+                "DELETE FROM session_context WHERE session_id = ? AND id NOT IN "
+                "(SELECT id FROM session_context WHERE session_id = ? ORDER BY id DESC LIMIT ?)",
+                (session.session_id, session.session_id, keep),
+            )
+            return conn.execute(
+                "SELECT text FROM session_context WHERE session_id = ? ORDER BY id DESC LIMIT ?",
+                (session.session_id, keep),
+            ).fetchall()
+
+        rows = await self._db.write(_append)
+        context = [text for (text,) in reversed(rows)]
+        # Mirror it locally so the in-process session stays consistent
+        session.context.clear()
+        session.context.extend(context)
+        return context
+
+    async def clear_context(self, session_id: str):
+        def _clear(conn):
+            conn.execute("DELETE FROM session_context WHERE session_id = ?", (session_id,))
+            return _sessions_with_context(conn)
+
+        self.sessions_with_context = await self._db.write(_clear)
+
+    async def sweep(self) -> int:
+        removed = await self.audio.sweep()
+
+        def _sweep(conn):
+            conn.execute(
+                "DELETE FROM session_context WHERE session_id IN (SELECT session_id FROM session_context "
+                "GROUP BY session_id HAVING MAX(ts) < ?)",
+                (time.time() - self.context_ttl_seconds,),
+            )
+            return _sessions_with_context(conn)
+
+        self.sessions_with_context = await self._db.write(_sweep)
+        return removed
+
+    def close(self):
+        self._db.close()
+
+    def stats(self) -> dict:
+        return {"backend": self.name, "path": self.path, "sessions_with_context": self.sessions_with_context}
+
+
+def _sessions_with_context(conn: sqlite3.Connection) -> int:
+    return conn.execute("SELECT COUNT(DISTINCT session_id) FROM session_context").fetchone()[0]
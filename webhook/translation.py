@@ -0,0 +1,57 @@
+"""
+Helpers for packing many translations into few LLM calls.
+
+Texts are numbered one per line and packed into chunks under a token budget;
+the model answers with the same numbering, which maps each output line back
+to its input.
+"""
+
+import re
+
+TRANSLATE_SYSTEM_PROMPT = "Translate between English and Brazilian Portuguese. Be natural, not literal. Just return the translation."
+
+BATCH_SYSTEM_PROMPT = """Translate each numbered line between English and Brazilian Portuguese.
+Be natural, not literal.
+Answer with exactly one line per input, keeping its number: "N. translation".
+Do not add notes, blank lines or anything else."""
+
+_NUMBERED_LINE = re.compile(r"^\s*(\d+)[.)]\s*(.*?)\s*$")
+
+
+def estimate_tokens(text: str) -> int:
+    """Cheap token estimate (~3 characters per token for EN/PT text, plus numbering)."""
+    return len(text) // 3 + 4
+
+
+def pack_batches(texts: list[str], max_tokens: int, max_items: int) -> list[list[int]]:
+    """Group text indexes into chunks whose estimated size stays under max_tokens."""
+    batches: list[list[int]] = []
+    current: list[int] = []
+    current_tokens = 0
+    for index, text in enumerate(texts):
+        tokens = estimate_tokens(text)
+        if current and (current_tokens + tokens > max_tokens or len(current) >= max_items):
+            batches.append(current)
+            current, current_tokens = [], 0
+        current.append(index)
+        current_tokens += tokens
+    if current:
+        batches.append(current)
+    return batches
+
+
+def numbered_prompt(texts: list[str]) -> str:
+    """Number texts 1..n, one per line (newlines inside a text are flattened)."""
+    return "\n".join(f"{n}. {' '.join(text.split())}" for n, text in enumerate(texts, 1))
+
+
+def parse_numbered(output: str, count: int) -> dict[int, str]:
+    """Map 1-based line numbers to translations, ignoring anything out of range."""
+    translations: dict[int, str] = {}
+    for line in output.splitlines():
+        match = _NUMBERED_LINE.match(line)
+        if match:
+            number = int(match.group(1))
+            if 1 <= number <= count and number not in translations and match.group(2):
+                translations[number] = match.group(2)
+    return translations
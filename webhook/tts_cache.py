@@ -0,0 +1,123 @@
+"""
+Content-addressed cache for synthesized phrase audio.
+
+The coach keeps suggesting the same follow-ups, so TTS results are keyed on a
+hash of the normalized phrase and voice. Entries are evicted least-recently-used
+once the total byte budget is exceeded, and concurrent requests for the same
+phrase share a single synthesis call. Each audio format is cached separately.
+"""
+
+import asyncio
+import hashlib
+import re
+import unicodedata
+from collections import OrderedDict
+from typing import Awaitable, Callable
+
+
+def normalize_phrase(text: str) -> str:
+    """Normalize a phrase so trivially different spellings share one cache entry."""
+    text = unicodedata.normalize("NFC", text)
+    return re.sub(r"\s+", " ", text).strip().casefold()
+
+
+def phrase_key(text: str, voice: str) -> str:
+    """Stable content hash for a (phrase, voice) pair."""
+    return hashlib.sha256(f"{voice}\0{normalize_phrase(text)}".encode("utf-8")).hexdigest()
+
+
+def variant_key(key: str, response_format: str) -> str:
+    """Cache key for one encoding of a phrase."""
+    return f"{key}.{response_format}"
+
+
+class TTSCache:
+    """Byte-budgeted LRU of synthesized audio with single-flight generation."""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self.merged = 0
+        self.evictions = 0
+        self._entries: OrderedDict[str, bytes] = OrderedDict()
+        self._inflight: dict[str, asyncio.Future] = {}
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key: str) -> bytes | None:
+        """Return cached audio and mark it recently used."""
+        audio = self._entries.get(key)
+        if audio is not None:
+            self._entries.move_to_end(key)
+        return audio
+
+    def put(self, key: str, audio: bytes):
+        """Store audio, evicting the least recently used entries over budget."""
+        if len(audio) > self.max_bytes:
+            return
+        old = self._entries.pop(key, None)
+        if old is not None:
+            self.total_bytes -= len(old)
+        self._entries[key] = audio
+        self.total_bytes += len(audio)
+        while self.total_bytes > self.max_bytes:
+            _, evicted = self._entries.popitem(last=False)
+            self.total_bytes -= len(evicted)
+            self.evictions += 1
+
+    async def get_or_generate(
+        self,
+        text: str,
+        voice: str,
+        generate: Callable[[str, str, str], Awaitable[bytes | None]],
+        response_format: str = "mp3",
+    ) -> tuple[str, bytes | None]:
+        """
+        Return (key, audio) for a phrase in one format, synthesizing it only on a miss.
+
+        The key identifies the phrase whatever the format. Callers asking for
+        audio that is already being synthesized wait on the same call instead
+        of starting another one. Failures are not cached.
+        """
+        key = phrase_key(text, voice)
+        cache_key = variant_key(key, response_format)
+
+        audio = self.get(cache_key)
+        if audio is not None:
+            self.hits += 1
+            return key, audio
+
+        pending = self._inflight.get(cache_key)
+        if pending is not None:
+            self.merged += 1
+            return key, await asyncio.shield(pending)
+
+        self.misses += 1
+        future = asyncio.get_running_loop().create_future()
+        self._inflight[cache_key] = future
+        audio = None
+        try:
+            audio = await generate(text, voice, response_format)
+            if audio:
+                self.put(cache_key, audio)
+        finally:
+            del self._inflight[cache_key]
+            future.set_result(audio)
+        return key, audio
+
+    def stats(self) -> dict:
+        """Counters for monitoring cache effectiveness."""
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": self.total_bytes,
+            "max_bytes": self.max_bytes,
+            "hits": self.hits,
+            "misses": self.misses,
+            "merged": self.merged,
+            "evictions": self.evictions,
+            "hit_rate": round(self.hits / lookups, 3) if lookups else 0.0,
+        }